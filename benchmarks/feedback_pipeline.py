@@ -0,0 +1,367 @@
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import re
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import Dict, Final, List, Optional
+
+import aiohttp
+from aiohttp import web
+from loguru import logger
+
+from bot import feedback, outbound, steam_profiles, translator
+from bot.feedback_pool import FeedbackPool
+from bot.language_detect import detector
+from bot.outbound import OutboundScheduler
+from bot.steam_profiles import SteamProfiles
+
+# Runs the real feedback path (pubsub reader -> pool -> prepare_suggestion -> send_suggestion -> outbox)
+# against local stand-ins of redis, Steam API, Google translation and discord:
+#   python -m benchmarks.feedback_pipeline --bursts 10,100,1000 --workers 4
+
+CUSTOM_GAMES: Final = ("CustomHeroClash", "Dota12v12", "Overthrow", "WarMasters")
+STAGES: Final = ("translate", "steam_profile", "prepare", "outbound", "end_to_end")
+
+_MARKER_REGEX: Final = re.compile(r"\[bench (\d+)]")
+
+ENGLISH_TEXTS: Final = (
+    "please fix the bug where my hero gets stuck after using blink in the river",
+    "the new patch is great but the shop takes way too long to open",
+    "can you add a button to skip the intro, it is really annoying",
+    "my rating went down even though we won the game, something is wrong",
+)
+FOREIGN_TEXTS: Final = (
+    "пожалуйста исправьте баг с героем который застревает после блинка",
+    "el nuevo parche es genial pero la tienda tarda mucho en abrir",
+    "bitte fügt einen knopf hinzu um das intro zu überspringen",
+    "meu rating caiu mesmo depois de vencermos a partida, algo está errado",
+)
+
+
+class FakeRedis:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.strings: Dict[str, str] = {}
+        self.hashes: Dict[str, Dict[str, str]] = defaultdict(dict)
+
+    async def mget(self, *keys):
+        await asyncio.sleep(self.latency)
+        return [self.strings.get(key) for key in keys]
+
+    async def hmget(self, key, *fields):
+        await asyncio.sleep(self.latency)
+        return [self.hashes[key].get(field) for field in fields]
+
+    async def hmset_dict(self, key, values: dict):
+        await asyncio.sleep(self.latency)
+        self.hashes[key].update(values)
+
+    def pipeline(self):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self.commands = []
+
+    def setex(self, key, ttl, value):
+        self.commands.append((key, value))
+
+    async def execute(self):
+        await asyncio.sleep(self.redis.latency)
+        self.redis.strings.update(self.commands)
+        return [True] * len(self.commands)
+
+
+# stands in for aioredis pubsub Receiver, messages are shaped as (channel name, payload)
+class FakeReceiver:
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    def publish(self, channel: str, payload: str):
+        self.queue.put_nowait((channel, payload))
+
+    def stop(self):
+        self.queue.put_nowait(None)
+
+    async def iter(self):
+        while True:
+            message = await self.queue.get()
+            if message is None:
+                return
+            yield message[0], message
+
+
+class StubTranslationClient:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.requests = 0
+
+    async def translate_text(self, request: dict):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        return SimpleNamespace(translations=[
+            SimpleNamespace(translated_text=f"translated: {text}", detected_language_code="ru")
+            for text in request["contents"]
+        ])
+
+
+class StubSteamApi:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.requests = 0
+        self.runner: Optional[web.AppRunner] = None
+        self.url = ""
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/ISteamUser/GetPlayerSummaries/v0002/", self.summaries)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/ISteamUser/GetPlayerSummaries/v0002/"
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+
+    async def summaries(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        players = [
+            {"steamid": steam_id, "personaname": f"player {steam_id[-4:]}", "avatarmedium": ""}
+            for steam_id in request.query.get("steamids", "").split(",") if steam_id
+        ]
+        return web.json_response({"response": {"players": players}})
+
+
+class FakeChannel:
+    def __init__(self, channel_id: int, name: str, latency: float, on_sent):
+        self.id = channel_id
+        self.name = name
+        self.latency = latency
+        self.on_sent = on_sent
+        self.message_ids = itertools.count(1)
+
+    def __str__(self):
+        return self.name
+
+    async def send(self, embed=None):
+        await asyncio.sleep(self.latency)
+        self.on_sent([embed.to_dict()])
+        return SimpleNamespace(id=next(self.message_ids))
+
+    async def post_embeds(self, embeds: List[dict]) -> dict:
+        await asyncio.sleep(self.latency)
+        self.on_sent(embeds)
+        return {"id": str(next(self.message_ids))}
+
+
+# replaces `bot.http` for multi-embed messages posted through raw route
+class FakeHttp:
+    def __init__(self, channels: Dict[int, FakeChannel]):
+        self.channels = channels
+
+    async def request(self, route, json=None):
+        return await self.channels[route.channel_id].post_embeds(json["embeds"])
+
+
+def percentile(samples: List[float], percent: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def make_messages(count: int, foreign_share: float, players: int, seed: int) -> List[dict]:
+    rng = random.Random(seed)
+    messages = []
+    for i in range(count):
+        texts = FOREIGN_TEXTS if rng.random() < foreign_share else ENGLISH_TEXTS
+        messages.append({
+            "custom_game": rng.choice(CUSTOM_GAMES),
+            "steam_id": str(76561198000000000 + rng.randrange(players)),
+            # marker keeps texts unique (real feedback rarely repeats) and lets fake channel match deliveries
+            "text": f"{rng.choice(texts)} [bench {i}]",
+        })
+    return messages
+
+
+class BurstRun:
+    def __init__(self, args, steam_api: StubSteamApi, session: aiohttp.ClientSession):
+        self.args = args
+        self.samples: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        self.published_at: Dict[int, float] = {}
+        self.delivered = 0
+        self.messages_sent = 0
+        self.done = asyncio.Event()
+        self.expected = 0
+
+        redis = FakeRedis(args.redis_latency)
+        self.translation_client = StubTranslationClient(args.translate_latency)
+        translator.client = self.translation_client
+        translator.batcher = translator._TranslationBatcher()
+        translator.attach_redis(redis)
+
+        channels = {
+            i: FakeChannel(i, game.lower(), args.discord_latency, self._on_sent)
+            for i, game in enumerate(CUSTOM_GAMES, start=1)
+        }
+        self.bot = SimpleNamespace(
+            http=FakeHttp(channels),
+            report_channels={game: channels[i] for i, game in enumerate(CUSTOM_GAMES, start=1)},
+        )
+        self.bot.steam_profiles = SteamProfiles(session, redis, "benchmark")
+        self.bot.outbound = OutboundScheduler(self.bot, linger=args.linger)
+        self.bot.feedback_pool = FeedbackPool(
+            self._timed("prepare", lambda decoded: feedback.prepare_suggestion(self.bot, decoded)),
+            self._send, args.workers, args.queue_size
+        )
+        self.steam_api = steam_api
+        self.steam_requests_before = steam_api.requests
+
+        self._translate = translator.translate
+        translator.translate = self._timed("translate", self._translate)
+        self.bot.steam_profiles.get = self._timed("steam_profile", self.bot.steam_profiles.get)
+
+    def _timed(self, stage: str, function):
+        async def wrapper(*args):
+            started_at = time.perf_counter()
+            try:
+                return await function(*args)
+            finally:
+                self.samples[stage].append(time.perf_counter() - started_at)
+        return wrapper
+
+    async def _send(self, prepared) -> Optional[asyncio.Future]:
+        receipt = await feedback.send_suggestion(self.bot, prepared)
+        if receipt is not None:
+            started_at = time.perf_counter()
+            receipt.add_done_callback(
+                lambda _: self.samples["outbound"].append(time.perf_counter() - started_at)
+            )
+        return receipt
+
+    def _on_sent(self, embeds: List[dict]):
+        now = time.perf_counter()
+        self.messages_sent += 1
+        for embed in embeds:
+            match = _MARKER_REGEX.search(embed.get("description", ""))
+            if match:
+                self.samples["end_to_end"].append(now - self.published_at[int(match.group(1))])
+            self.delivered += 1
+        if self.delivered >= self.expected:
+            self.done.set()
+
+    async def run(self, messages: List[dict]) -> dict:
+        self.expected = len(messages)
+        receiver = FakeReceiver()
+        pool = self.bot.feedback_pool
+        pool.start()
+        reader = asyncio.ensure_future(feedback.read_pubsub(self.bot, receiver))
+
+        started_at = time.perf_counter()
+        for i, decoded in enumerate(messages):
+            self.published_at[i] = time.perf_counter()
+            receiver.publish(f"suggestions:{decoded['custom_game']}", json.dumps(decoded))
+        try:
+            await asyncio.wait_for(self.done.wait(), self.args.timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"burst of {len(messages)} timed out with {self.delivered} delivered")
+        elapsed = time.perf_counter() - started_at
+
+        receiver.stop()
+        await reader
+        await pool.stop()
+        for outbox in self.bot.outbound.outboxes.values():
+            outbox.task.cancel()
+        translator.translate = self._translate
+        return {
+            "burst": len(messages),
+            "delivered": self.delivered,
+            "elapsed": elapsed,
+            "rate": self.delivered / elapsed if elapsed else 0.0,
+            "messages_sent": self.messages_sent,
+            "translate_requests": self.translation_client.requests,
+            "steam_requests": self.steam_api.requests - self.steam_requests_before,
+            "stages": {stage: samples for stage, samples in self.samples.items()},
+        }
+
+
+def print_report(result: dict, peak_memory: Optional[int]):
+    print(
+        f"\nburst {result['burst']}: {result['delivered']} delivered in {result['elapsed']:.2f}s "
+        f"({result['rate']:.1f} msg/s), {result['messages_sent']} discord messages, "
+        f"{result['translate_requests']} translate / {result['steam_requests']} steam requests"
+    )
+    if peak_memory is not None:
+        print(f"  peak traced memory: {peak_memory / 1024 / 1024:.2f} MiB")
+    print(f"  {'stage':<14}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, samples in result["stages"].items():
+        print(
+            f"  {stage:<14}{len(samples):>7}{percentile(samples, 50) * 1000:>10.1f}"
+            f"{percentile(samples, 95) * 1000:>10.1f}{percentile(samples, 99) * 1000:>10.1f}"
+        )
+
+
+async def main(args):
+    if not args.rate_limit:
+        outbound._RATE_LIMIT_COUNT = 10 ** 9
+
+    steam_api = StubSteamApi(args.steam_latency)
+    await steam_api.start()
+    steam_profiles._SUMMARIES_URL = steam_api.url
+    detector.hits = detector.misses = detector.api_english = 0
+    try:
+        async with aiohttp.ClientSession() as session:
+            for burst in args.bursts:
+                messages = make_messages(burst, args.foreign_share, args.players, args.seed)
+                if args.trace_memory:
+                    tracemalloc.start()
+                result = await BurstRun(args, steam_api, session).run(messages)
+                peak_memory = None
+                if args.trace_memory:
+                    peak_memory = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                print_report(result, peak_memory)
+    finally:
+        await steam_api.stop()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark of feedback pipeline against local stand-ins")
+    parser.add_argument("--bursts", default="10,100,500",
+                        type=lambda value: [int(size) for size in value.split(",")],
+                        help="comma separated burst sizes, each burst runs on fresh caches")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queue-size", type=int, default=500)
+    parser.add_argument("--linger", type=float, default=0.5, help="outbox linger before packing embeds")
+    parser.add_argument("--foreign-share", type=float, default=0.3, help="share of feedback needing translation")
+    parser.add_argument("--players", type=int, default=200, help="distinct steam ids feedback comes from")
+    parser.add_argument("--translate-latency", type=float, default=0.15)
+    parser.add_argument("--steam-latency", type=float, default=0.1)
+    parser.add_argument("--discord-latency", type=float, default=0.12)
+    parser.add_argument("--redis-latency", type=float, default=0.001)
+    parser.add_argument("--no-rate-limit", dest="rate_limit", action="store_false",
+                        help="ignore discord per-channel rate limit, measuring only our own overhead")
+    parser.add_argument("--no-memory", dest="trace_memory", action="store_false",
+                        help="skip tracemalloc, which slows everything down noticeably")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    asyncio.get_event_loop().run_until_complete(main(parse_args()))
@@ -0,0 +1,94 @@
+import asyncio
+import re
+from typing import Awaitable, Callable, Dict, Final, List, Optional, Tuple
+
+from aiohttp import ClientSession
+from loguru import logger
+from arcadia_common import metrics
+
+from .github_integration import get_issues_or_pulls, search_org_issues
+from .github_scheduler import Priority, github_priority
+from .issue_index import issue_index
+
+BULK_MAX_ISSUES: Final = 300
+_BULK_CONCURRENCY: Final = 8
+_PROGRESS_INTERVAL: Final = 2.0  # seconds between progress message edits
+
+_issue_number_regex = re.compile(r"#?(\d+)")
+
+_mutations_total = metrics.counter("bulk_mutations_total", "Issues mutated by bulk operations", ["action", "result"])
+
+# mutation of a single issue by its number, returning (status, details) like API helpers
+Operation = Callable[[int], Awaitable[Tuple[bool, object]]]
+
+
+def parse_issue_numbers(targets: str) -> Optional[List[int]]:
+    # explicit list like `12 #15 40`, None if targets are a search query
+    tokens = targets.split()
+    if not tokens or not all(_issue_number_regex.fullmatch(token) for token in tokens):
+        return None
+    return list(dict.fromkeys(int(_issue_number_regex.fullmatch(token).group(1)) for token in tokens))
+
+
+# Issues that bulk operation would touch: explicit numbers are looked up in one batched GraphQL query,
+# search queries go to local issue index first and to GitHub search if index can't answer them.
+# Returns found issues (number, title, state, html_url) and numbers that don't exist; None if search failed
+async def find_targets(session: ClientSession, repo: str, targets: str) -> Optional[Tuple[List[dict], List[int]]]:
+    numbers = parse_issue_numbers(targets)
+    if numbers is not None:
+        resolved = await get_issues_or_pulls(session, [(repo, number) for number in numbers])
+        found = [
+            {"number": number, "title": record["title"], "state": record["state"].lower(), "html_url": record["url"]}
+            for number in numbers if (record := resolved.get((repo, number)))
+        ]
+        return found, [number for number in numbers if (repo, number) not in resolved]
+
+    result = await issue_index.search(repo, targets, 1, BULK_MAX_ISSUES + 1)
+    if result is not None:
+        return result["items"], []
+    # one over the limit is enough to reject the operation, pages past it would only spend search budget
+    status, items = await search_org_issues(session, f"repo:arcadia-redux/{repo} {targets}", BULK_MAX_ISSUES + 1)
+    if not status:
+        logger.warning(f"[Bulk] search of `{targets}` in {repo} failed: {items}")
+        return None
+    return items, []
+
+
+# Applies operation to every issue concurrently in the bulk lane of github scheduler, which keeps it within
+# rate budget left by interactive requests. `on_progress` is awaited periodically and once after the last issue
+class BulkRun:
+    def __init__(self, action: str, numbers: List[int], operation: Operation):
+        self.action = action
+        self.numbers = numbers
+        self.operation = operation
+        self.done = 0
+        self.finished = False
+        self.failed: Dict[int, str] = {}
+
+    @property
+    def total(self) -> int:
+        return len(self.numbers)
+
+    async def run(self, on_progress: Callable[["BulkRun"], Awaitable[None]]):
+        semaphore = asyncio.Semaphore(_BULK_CONCURRENCY)
+        with github_priority(Priority.BULK):
+            jobs = asyncio.gather(*[self._apply(semaphore, number) for number in self.numbers])
+        while not jobs.done():
+            await asyncio.wait([jobs], timeout=_PROGRESS_INTERVAL)
+            if not jobs.done():
+                await on_progress(self)
+        await jobs
+        self.finished = True
+        await on_progress(self)
+
+    async def _apply(self, semaphore: asyncio.Semaphore, number: int):
+        async with semaphore:
+            try:
+                status, details = await self.operation(number)
+            except Exception as error:
+                logger.exception(f"[Bulk] {self.action} of #{number} failed")
+                status, details = False, repr(error)
+        if not status:
+            self.failed[number] = str(details)
+        self.done += 1
+        _mutations_total.inc(action=self.action, result="ok" if status else "failed")
@@ -0,0 +1,76 @@
+import asyncio
+from typing import Final, Set
+
+from aioredis.errors import RedisError
+from aioredis.pubsub import Receiver
+from loguru import logger
+
+# written by bot, read by `redis_backup.py save --incremental`
+CHANGELOG_KEY: Final = "backup:changelog"
+
+# keyspace events of every command that changes data, `E` for keyevent channels, `A` for all classes
+_NOTIFY_EVENTS: Final = "EA"
+_FLUSH_INTERVAL: Final = 1.0
+
+# `backup:` is excluded so changelog writes don't record themselves, cache modules add their own keys
+_excluded_prefixes: Set[str] = {"backup:"}
+
+
+def exclude_from_backups(prefix: str):
+    # keys starting with prefix are cheap to rebuild and churn a lot, changes to them aren't recorded
+    _excluded_prefixes.add(prefix)
+
+
+
+# Records names of changed keys into `backup:changelog` sorted set (scored by redis time of change in ms), so incremental
+# backups read only keys touched since previous snapshot. Keyspace notifications cover writes of every client,
+# including the webhook listener, expirations and evictions
+class ChangeTracker:
+    def __init__(self, redis):
+        self.redis = redis
+        self.changed: Set[str] = set()
+        self.tasks = []
+
+    async def start(self):
+        try:
+            config = await self.redis.config_get("notify-keyspace-events")
+            events = next(iter(config.values()), b"")
+            events = events.decode() if isinstance(events, bytes) else events
+            missing = "".join(flag for flag in _NOTIFY_EVENTS if flag not in events)
+            if missing:
+                await self.redis.config_set("notify-keyspace-events", events + missing)
+        except RedisError as error:
+            logger.warning(f"[Backup] can't enable keyspace notifications, incremental backups will miss changes: "
+                           f"{error!r}")
+            return
+        receiver = Receiver()
+        await self.redis.psubscribe(receiver.pattern("__keyevent@*__:*"))
+        self.tasks = [
+            asyncio.ensure_future(self._listen(receiver)),
+            asyncio.ensure_future(self._flush_periodically()),
+        ]
+        logger.info("[Backup] tracking changed keys")
+
+    @logger.catch
+    async def _listen(self, receiver: Receiver):
+        excluded = tuple(_excluded_prefixes)
+        async for _, message in receiver.iter():
+            key = message[1]
+            key = key.decode("utf-8", "replace") if isinstance(key, bytes) else key
+            if not key.startswith(excluded):
+                self.changed.add(key)
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(_FLUSH_INTERVAL)
+            if not self.changed:
+                continue
+            changed, self.changed = self.changed, set()
+            try:
+                # flush time is never earlier than the change itself, so a snapshot taken in between still sees it.
+                # redis clock is used, same as `redis_backup.py` does, so clock of this host doesn't matter
+                now = int(await self.redis.time() * 1000)
+                await self.redis.zadd(CHANGELOG_KEY, *[item for key in changed for item in (now, key)])
+            except RedisError as error:
+                logger.warning(f"[Backup] failed to record {len(changed)} changed keys: {error!r}")
+                self.changed |= changed
@@ -1,6 +1,10 @@
+import asyncio
 from asyncio import TimeoutError
-from typing import Final
-from discord import Embed
+from concurrent.futures import ProcessPoolExecutor
+from os import getenv
+from typing import Final, List, Optional, Tuple
+from aiohttp import ClientError
+from discord import Attachment, Embed, HTTPException
 from discord.ext.commands import Context
 from loguru import logger
 from PIL import Image
@@ -8,8 +12,21 @@ from discord import File
 from uuid import uuid1
 import io
 
+from ..transport import transport
+
 PAGE_CONTROLS: Final = {"⏮": -1, "⏭": 1}
 
+# attachments this large are compressed before linking, github doesn't show bigger images
+_COMPRESS_THRESHOLD: Final = 10_000_000
+# larger ones are linked as they are, without being downloaded
+_MAX_DOWNLOAD_SIZE: Final = int(getenv("ATTACHMENT_MAX_DOWNLOAD_SIZE", 50 * 1024 * 1024))
+_DOWNLOAD_CHUNK_SIZE: Final = 256 * 1024
+# per-message upload limits of discord outside of boosted guilds
+_DEFAULT_UPLOAD_LIMIT: Final = 8 * 1024 * 1024
+_MAX_FILES_PER_MESSAGE: Final = 10
+_IMAGE_WORKERS: Final = int(getenv("IMAGE_WORKERS", 2))
+_executor: Optional[ProcessPoolExecutor] = None
+
 
 async def get_argument(context: Context, text: str) -> str:
     argument = None
@@ -35,45 +52,113 @@ def update_embed(embed, desc: str, author: str, footer: str = ""):
     return Embed().from_dict(old_embed)
 
 
-async def process_attachments(context, attachment_url: str):
-    return await process_attachments_contextless(context.message, context.bot.session, attachment_url)
+async def process_attachments(context, attachments: List[Attachment]) -> str:
+    return await process_attachments_contextless(context.message, transport.discord_cdn, attachments)
 
 
-async def process_attachments_contextless(message, session, attachment_url: str, delete_original: bool = True) -> str:
-    logger.info(f"[Image processing] initial image url: {attachment_url}")
-    if delete_original:
-        prev_text = f"From {message.author.mention}\n```{message.content}```"
-    else:
-        prev_text = ""
+def _image_executor() -> ProcessPoolExecutor:
+    # created on first use, so worker processes are forked only once bot actually handles an image
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=_IMAGE_WORKERS)
+    return _executor
 
-    resp = await session.get(attachment_url)
 
-    content_length = int(resp.headers['Content-Length'])
-    logger.info(f"[Image processing] received content length: {content_length}")
+def compress_image(data: bytes) -> bytes:
+    # runs in worker process
+    img = Image.open(io.BytesIO(data))
+    # resize for very large images
+    if img.width > 1600:
+        img = img.resize((img.width // 2, img.height // 2))
     result = io.BytesIO()
-    if content_length >= 1e7:
-        warn_msg = await message.reply(
-            f"Attached image size exceeded 10mb. Compressing image, issue will be opened afterwards."
-        )
-        logger.info("[Image processing] compressing image")
-        data = io.BytesIO(await resp.read())
-        img = Image.open(data)
-
-        # resize for very large images
-        if img.width > 1600:
-            logger.info(f"Image width exceeded 1600, resizing")
-            img = img.resize((img.width // 2, img.height // 2))
-        img.save(result, optimize=True, quality=50, format='PNG')
-        logger.info(f"new size: {result.tell()}")
-        result.seek(0)
-        compressed_message = await message.reply(
-            f"{prev_text}With compressed image",
-            file=File(result, filename=f"resized_image_{uuid1().int}.png")
-        )
-        attachment_url = compressed_message.attachments[0].url
-        logger.info(f"new image url: {attachment_url}")
+    img.save(result, optimize=True, quality=50, format='PNG')
+    return result.getvalue()
+
+
+async def _download_oversized(session, attachment_url: str) -> Optional[bytes]:
+    # body of attachment too large to be shown on github, None if it is small enough or exceeds download cap
+    try:
+        async with session.get(attachment_url) as resp:
+            content_length = resp.content_length
+            logger.info(f"[Image processing] received content length: {content_length}")
+            if content_length is not None and not _COMPRESS_THRESHOLD <= content_length <= _MAX_DOWNLOAD_SIZE:
+                return None
+            data = bytearray()
+            async for chunk in resp.content.iter_chunked(_DOWNLOAD_CHUNK_SIZE):
+                data.extend(chunk)
+                if len(data) > _MAX_DOWNLOAD_SIZE:
+                    logger.warning(f"[Image processing] {attachment_url} exceeds download cap, left as is")
+                    return None
+    except (ClientError, TimeoutError) as error:
+        logger.warning(f"[Image processing] failed to download {attachment_url}: {error!r}")
+        return None
+    return bytes(data) if len(data) >= _COMPRESS_THRESHOLD else None
+
+
+async def _compress(data: bytes) -> Optional[bytes]:
+    try:
+        return await asyncio.get_event_loop().run_in_executor(_image_executor(), compress_image, data)
+    except Exception:
+        logger.exception("[Image processing] failed to compress image")
+        return None
+
+
+def _upload_batches(reposted: List[Tuple[int, bytes]], limit: int) -> List[List[Tuple[int, bytes]]]:
+    # groups compressed images into messages within discord upload limits, images over the limit are left out
+    batches, size = [], 0
+    for index, data in reposted:
+        if len(data) > limit:
+            logger.warning(f"[Image processing] compressed image of {len(data)} bytes exceeds upload limit")
+            continue
+        if not batches or size + len(data) > limit or len(batches[-1]) >= _MAX_FILES_PER_MESSAGE:
+            batches.append([])
+            size = 0
+        batches[-1].append((index, data))
+        size += len(data)
+    return batches
+
+
+# Markdown image links of all attachments. Images over 10mb aren't shown by github, those are downloaded
+# concurrently, compressed in worker processes and reposted to discord in as few messages as upload limit allows,
+# to link from there. Original message is deleted only if links to every attachment were replaced
+async def process_attachments_contextless(message, session, attachments: List[Attachment],
+                                          delete_original: bool = True) -> str:
+    urls = [attachment.url for attachment in attachments]
+    logger.info(f"[Image processing] initial image urls: {urls}")
+    downloads = await asyncio.gather(*[_download_oversized(session, url) for url in urls])
+    oversized = [index for index, data in enumerate(downloads) if data]
+    if not oversized:
+        return "".join(f"\n![image]({url})" for url in urls)
+
+    warn_msg = await message.reply(
+        f"Attached image size exceeded 10mb. Compressing image, issue will be opened afterwards."
+    )
+    replaced = set()
+    try:
+        logger.info(f"[Image processing] compressing {len(oversized)} images")
+        compressed = await asyncio.gather(*[_compress(downloads[index]) for index in oversized])
+        reposted = [(index, data) for index, data in zip(oversized, compressed) if data]
+        delete_original = delete_original and len(reposted) == len(urls)
+        upload_limit = message.guild.filesize_limit if message.guild else _DEFAULT_UPLOAD_LIMIT
+        prev_text = f"From {message.author.mention}\n```{message.content}```" if delete_original else ""
+        for batch in _upload_batches(reposted, upload_limit):
+            logger.info(f"new sizes: {[len(data) for _, data in batch]}")
+            try:
+                compressed_message = await message.reply(
+                    f"{prev_text}With compressed image",
+                    files=[File(io.BytesIO(data), filename=f"resized_image_{uuid1().int}.png") for _, data in batch]
+                )
+            except HTTPException as error:
+                logger.warning(f"[Image processing] failed to repost compressed images, linking originals: {error!r}")
+                continue
+            prev_text = ""
+            for (index, _), attachment in zip(batch, compressed_message.attachments):
+                urls[index] = attachment.url
+                replaced.add(index)
+                logger.info(f"new image url: {attachment.url}")
+    finally:
         await warn_msg.delete()
-        if delete_original:
-            await message.delete()
+    if delete_original and len(replaced) == len(urls):
+        await message.delete()
 
-    return f"\n![image]({attachment_url})"
+    return "".join(f"\n![image]({url})" for url in urls)
@@ -4,6 +4,10 @@ from loguru import logger
 from datetime import datetime
 from croniter import croniter
 
+from ..link_commands import is_reserved
+
+_LIST_PAGE_LENGTH = 1900
+
 
 class Core(commands.Cog, name="Core"):
     def __init__(self, bot):
@@ -29,7 +33,7 @@ class Core(commands.Cog, name="Core"):
 
     @staticmethod
     def reserved(key: str) -> bool:
-        return "-report-channel-id" in key or "-report-channel-name" in key
+        return is_reserved(key)
 
     @commands.command()
     async def season_reset(self, context: commands.Context):
@@ -43,8 +47,10 @@ class Core(commands.Cog, name="Core"):
     async def link(self, context: commands.Context, key: str, *args):
         if self.reserved(key):
             return
-        await context.bot.redis.delete(key)
-        await context.bot.redis.rpush(key, *args)
+        if not args:
+            await context.send(f"Usage: `link <key> <values...>`")
+            return
+        await context.bot.link_commands.set(key, list(args))
         await context.send(f"Successfully set link keypair")
 
     @commands.command()
@@ -52,15 +58,29 @@ class Core(commands.Cog, name="Core"):
     async def unlink(self, context: commands.Context, key: str):
         if self.reserved(key):
             return
-        await context.bot.redis.delete(key)
+        await context.bot.link_commands.delete(key)
         await context.send(f"Successfully deleted key <{key}>")
 
     @commands.command()
     @commands.has_permissions(manage_messages=True)
-    async def list_commands(self, context: commands.Context):
-        keys = await context.bot.redis.keys("*")
-        commands_list = f"\n".join([key.decode("utf-8") for key in keys])
-        await context.send(f"Linked commands:\n```{commands_list}```")
+    async def list_commands(self, context: commands.Context, prefix: str = ""):
+        keys = sorted([key async for key in context.bot.link_commands.iter_keys(prefix)])
+        if not keys:
+            await context.send(f"No linked commands{f' starting with `{prefix}`' if prefix else ''}")
+            return
+        # keep every message under discord limit of 2000 characters
+        pages, page, length = [], [], 0
+        for key in keys:
+            if page and length + len(key) > _LIST_PAGE_LENGTH:
+                pages.append(page)
+                page, length = [], 0
+            page.append(key)
+            length += len(key) + 1
+        pages.append(page)
+        for i, page in enumerate(pages):
+            header = f"Linked commands ({len(keys)}):\n" if i == 0 else ""
+            commands_list = "\n".join(page)
+            await context.send(f"{header}```{commands_list}```")
 
     @commands.command()
     @commands.has_permissions(manage_messages=True)
@@ -3,13 +3,28 @@ from discord import Embed
 from datetime import datetime
 from discord.colour import Colour
 import re
+from typing import Optional, Tuple
 
-from ..github_integration import get_issue_by_number, get_pull_request_by_number
+from ..github_integration import get_issues_or_pulls
 
 url_regex = re.compile(
     "(https?:\/\/(.+?\.)?github\.com\/arcadia-redux(\/[A-Za-z0-9\-\._~:\/\?#\[\]@!$&'\(\)\*\+,;\=]*)?)"
 )
 
+task_markers = {"- [x]": "✅", "* [x]": "✅", "- [ ]": "☐"}
+# github links, #111 issue numbers (for task lists) and task list checkboxes, all rewritten in one pass
+reference_regex = re.compile(
+    f"(?P<link>{url_regex.pattern})|(?P<ref> #(?P<number>[0-9]+))|(?P<task>- \\[x\\]|\\* \\[x\\]|- \\[ \\])"
+)
+
+
+def _link_target(link: str) -> Optional[Tuple[str, int]]:
+    link_split = link.split("/")
+    repo_name, obj_type, obj_id = link_split[-3:]
+    if obj_type not in ("issues", "pull") or not obj_id.isdigit():
+        return None
+    return repo_name, int(obj_id)
+
 
 def get_image_link(body: str) -> (str, str):
     result = re.search(
@@ -24,34 +39,34 @@ def get_image_link(body: str) -> (str, str):
     return "", body
 
 
+def _state_icon(state: str) -> str:
+    return "🟢" if state.lower() == "open" else "🔴"
+
+
 async def parse_markdown(session: ClientSession, text: str, repo_name: str) -> str:
-    issue_number_refs = re.findall(
-        r"( #[0-9]*)",  # searching for #111 issue numbers, for task lists
-        text
-    )
-    github_obj_links = re.findall(url_regex, text)
-    for issue_number in issue_number_refs:
-        status, issue_data = await get_issue_by_number(session, repo_name, issue_number.replace(" #", ""))
-        if status:
-            issue_state = "🟢" if issue_data['state'] == "open" else "🔴"
-            text = text.replace(
-                issue_number, f" {issue_state} [{issue_data['title']}{issue_number}]({issue_data['html_url']})"
-            )
-    for github_obj in github_obj_links:
-        github_obj_link = github_obj[0]
-        link_split = github_obj_link.split("/")
-        m_repo_name, obj_type, obj_id = link_split[-3:]
-        if obj_type == "issues":
-            status, obj_data = await get_issue_by_number(session, m_repo_name, obj_id)
-        else:
-            status, obj_data = await get_pull_request_by_number(session, m_repo_name, obj_id)
-        if status:
-            issue_state = "🟢" if obj_data['state'] == "open" else "🔴"
-            text = text.replace(
-                github_obj_link, f"{issue_state} [{obj_data['title']} #{obj_data['number']}]({github_obj_link})"
-            )
-
-    return text.replace("- [x]", "✅").replace("* [x]", "✅").replace("- [ ]", "☐")
+    references = set()
+    for match in reference_regex.finditer(text):
+        if match.group("number"):
+            references.add((repo_name, int(match.group("number"))))
+        elif match.group("link") and (link_target := _link_target(match.group("link"))):
+            references.add(link_target)
+    resolved = await get_issues_or_pulls(session, references) if references else {}
+
+    def replace(match: re.Match) -> str:
+        if match.group("task"):
+            return task_markers[match.group("task")]
+        if number := match.group("number"):
+            obj = resolved.get((repo_name, int(number)))
+            if not obj:
+                return match.group(0)
+            return f" {_state_icon(obj['state'])} [{obj['title']} #{number}]({obj['url']})"
+        link = match.group("link")
+        obj = resolved.get(_link_target(link))
+        if not obj:
+            return link
+        return f"{_state_icon(obj['state'])} [{obj['title']} #{obj['number']}]({link})"
+
+    return reference_regex.sub(replace, text)
 
 
 async def get_issue_embed(session: ClientSession, data: dict, object_id: str, repo_name: str, link: str) -> Embed:
@@ -1,12 +1,85 @@
 from discord.ext import commands, tasks
-from discord import colour, Member, Message
+from discord import colour, HTTPException, Member, Message
+from aiohttp import ClientError
 import asyncio
+from collections import defaultdict
 
 from ..github_integration import *
+from ..bulk_operations import BULK_MAX_ISSUES, BulkRun, Operation, find_targets
+from ..github_scheduler import Priority, github_priority
+from ..issue_index import issue_index
+from ..pagination import pager
 from .cog_util import *
 from .embeds import *
+from ..repo_index import repo_index
+from ..repo_metadata import repo_metadata
+from ..reply_targets import reply_targets
+from ..transport import transport
 
 _WarningLabelName: Final[str] = "[Auto] Cleanup warned"
+_ScanLabels: Final[List[str]] = ['"unknown cause"', '"needs confirmation"', f'"{_WarningLabelName}"']
+# label, comment and close mutations of a scan running at once, rate budget is enforced by github scheduler
+_SCAN_CONCURRENCY: Final[int] = 4
+
+
+_BULK_ACTIONS: Final[Tuple[str, ...]] = ("close", "label", "milestone", "assign")
+_BULK_PREVIEW_LINES: Final[int] = 15
+_BULK_USAGE: Final[str] = """
+`$bulk [repo] [issue numbers or search query] -> [action]: [arguments]` - apply action to many issues at once
+```
+$bulk war 12 #15 40 -> close: duplicate of #3
+$bulk war is:open label:"needs confirmation" -> label: wontfix "under review"
+$bulk war is:open no:milestone -> milestone: new round progress ui
+$bulk war is:open no:assignee crash -> assign: darklordabc @mention
+```
+Preview of affected issues is shown first, action runs after confirming it with ✅
+"""
+
+_SEARCH_HELP: Final[str] = (
+    "https://docs.github.com/en/github/searching-for-information-on-github/searching-on-github/"
+    "searching-issues-and-pull-requests#search-only-issues-or-pull-requests"
+)
+
+
+def _paged_embed(cursor: dict, data: dict) -> Embed:
+    repo = cursor["repo"]
+    if cursor["kind"] == "list":
+        embed = Embed(description=data["description"], timestamp=datetime.utcnow(), colour=colour.Color.dark_teal())
+        embed.set_author(
+            name=f"Issues: {cursor['per_page']} {cursor['state'].capitalize()} in {repo}",
+            url=f"https://github.com/arcadia-redux/{repo}/issues",
+            icon_url="https://cdn.discordapp.com/attachments/684952282076282882/838854388201553930/123.png"
+        )
+        embed.set_footer(text=f"Page: {cursor['page']}")
+        return embed
+
+    embed = Embed(
+        title=f"Total search results: {cursor['total']}",
+        description=f"{data['description']}\n\n[`How to compose queries`]({_SEARCH_HELP})",
+        timestamp=datetime.utcnow(),
+        colour=colour.Colour.blurple(),
+    )
+    embed.set_author(name=f"Search in {repo}", url=f"https://github.com/arcadia-redux/{repo}")
+    embed.set_footer(text=f"Page: {cursor['page']} / {pager.last_page(cursor)}")
+    return embed
+
+
+# sends first page of issue list or search results, page flips are handled by `on_reaction_add`
+async def _send_paged(context: Context, cursor: dict):
+    data = await pager.get_page(transport.github, cursor, cursor["page"])
+    if data is None:
+        await context.send("Github error occurred, try again later")
+        return
+    cursor["total"] = data.get("total")
+    message = await context.send(embed=_paged_embed(cursor, data))
+    if cursor["kind"] == "search" and pager.last_page(cursor) == 1:
+        return
+    await asyncio.gather(
+        pager.save_cursor(message.id, cursor),
+        message.add_reaction("⏮"),
+        message.add_reaction("⏭"),
+    )
+    pager.prefetch(transport.github, cursor, cursor["page"] + 1)
 
 
 class Github(commands.Cog, name="Github"):
@@ -22,7 +95,6 @@ class Github(commands.Cog, name="Github"):
             [["search", "s"], self._search_issues],
             [["assign", "as"], self._assign_to_issue],
         ]
-        self.private_repos = ["reVolt", "custom_hero_clash", "chclash_webserver", "war_masters"]
 
         self.reply_processors = {
             "assign": self._reply_assign,
@@ -31,7 +103,6 @@ class Github(commands.Cog, name="Github"):
             "milestone": self._reply_milestone,
         }
 
-        self.repos_stringified_list = ""
         self.url_regex = re.compile(
             "(https?:\/\/(.+?\.)?github\.com\/arcadia-redux(\/[A-Za-z0-9\-\._~:\/\?#\[\]@!$&'\(\)\*\+,;\=]*)?)"
         )
@@ -40,7 +111,16 @@ class Github(commands.Cog, name="Github"):
     @commands.Cog.listener()
     async def on_ready(self):
         logger.info("[COG] Github is ready!")
-        self.repos_stringified_list = await github_init(self.bot)
+        await self.bot.services_ready.wait()
+        await repo_index.load(self.bot.redis)
+        if not self.refresh_repos.is_running():
+            self.refresh_repos.start()
+        if not self.refresh_metadata.is_running():
+            await repo_metadata.start(self.bot.redis, transport.github)
+            self.refresh_metadata.start()
+        if not self.sync_issue_index.is_running():
+            await issue_index.start()
+            self.sync_issue_index.start()
 
         if not self.bot.running_local:
             self.scan_old_issues.start()
@@ -58,31 +138,30 @@ class Github(commands.Cog, name="Github"):
         if not reference:
             return
 
-        if reference.cached_message:
-            replied_message = reference.cached_message
-        else:
-            replied_message = await message.channel.fetch_message(reference.message_id)
-
-        if replied_message.author != self.bot.user:
-            return
-
-        if not replied_message.embeds:
+        targets = await reply_targets.get(reference.message_id)
+        if not targets:
+            targets = await self._targets_from_embeds(message, reference)
+        if not targets:
             return
 
-        issue_link_split = replied_message.embeds[0].author.url.split("/")
-        issue_id = issue_link_split[-1]
-        repo = issue_link_split[-3]
-
         body = message.content
         message_split = body.split(":")
         reply_command = message_split[0]
         args: List[str] = message_split[1].strip().split(" ") if len(message_split) > 1 else []
 
-        if "https://steamcommunity.com/profiles/" in replied_message.embeds[0].author.url:
-            if reply_command.lower() == "send":
-                await self._send_feedback_reply(message, replied_message, issue_id, message_split[1:])
+        if next(iter(targets.values()))["kind"] == "feedback":
+            # feedback messages may contain several embeds, `send 3:` replies to the third one
+            send_command = reply_command.lower().split()
+            if send_command and send_command[0] == "send":
+                index = int(send_command[1]) - 1 if len(send_command) > 1 and send_command[1].isdigit() else 0
+                target = targets.get(index)
+                if not target:
+                    await message.add_reaction("🚫")
+                    return
+                await self._send_feedback_reply(message, target["text"], target["steam_id"], message_split[1:])
             return
 
+        repo, issue_id = targets[0]["repo"], str(targets[0]["number"])
         callback = self.reply_processors.get(reply_command.lower(), None)
 
         if callback:
@@ -90,32 +169,76 @@ class Github(commands.Cog, name="Github"):
         else:
             if message.attachments:
                 body += await process_attachments_contextless(
-                    message, self.bot.session, message.attachments[0].url, False
+                    message, transport.discord_cdn, message.attachments, False
                 )
 
             status, _ = await comment_issue(
-                self.bot.session,
+                transport.github,
                 repo,
                 issue_id,
                 comment_wrap_contextless(body, message)
             )
         await message.add_reaction("✅" if status else "🚫")
 
-    async def _reply_assign(self, repo: str, issue_id: str, assignees: List[str]) -> bool:
+    async def _targets_from_embeds(self, message: Message, reference) -> Dict[int, dict]:
+        # messages posted before reply index existed, or whose entry expired: parse embeds of replied message
+        if reference.cached_message:
+            replied_message = reference.cached_message
+        else:
+            try:
+                replied_message = await message.channel.fetch_message(reference.message_id)
+            except HTTPException:
+                return {}
+
+        if replied_message.author != self.bot.user or not replied_message.embeds:
+            return {}
+
+        targets = {}
+        for index, embed in enumerate(replied_message.embeds):
+            url = embed.author.url
+            if not isinstance(url, str):
+                continue
+            if "https://steamcommunity.com/profiles/" in url:
+                text = embed.description.replace("```", "") if isinstance(embed.description, str) else ""
+                targets[index] = {"kind": "feedback", "steam_id": url.split("/")[-1], "text": text}
+            elif index == 0:
+                link_split = url.split("/")
+                if len(link_split) < 3 or not link_split[-1].isdigit():
+                    continue
+                kind = "pulls" if link_split[-2] == "pull" else "issues"
+                targets[index] = {"kind": kind, "repo": link_split[-3], "number": int(link_split[-1])}
+
+        for index, target in targets.items():
+            await reply_targets.record(replied_message.id, index, target)
+        return targets
+
+    async def _resolve_assignees(self, assignees: List[str]) -> List[Optional[str]]:
+        # discord mentions are replaced by github names assigned with `$add_github_name`, None if there is none
         for i, assignee in enumerate(assignees):
             if assignee.startswith("<"):
                 assignees[i] = await self.bot.redis.hget(
                     "github_mention", assignee.replace("!", ""), encoding='utf8'
                 )
-        status, _ = await assign_issue(self.bot.session, repo, issue_id, assignees)
+        return assignees
+
+    async def _reply_assign(self, repo: str, issue_id: str, assignees: List[str]) -> bool:
+        assignees = await self._resolve_assignees(assignees)
+        if not all(assignees) or repo_metadata.unknown_assignees(assignees):
+            return False
+        status, _ = await assign_issue(transport.github, repo, issue_id, assignees)
         return status
 
     async def _reply_close(self, repo: str, issue_id: str, reason: List[str]) -> bool:
-        status, _ = await comment_issue(self.bot.session, repo, issue_id, " ".join(reason))
-        status, _ = await close_issue(self.bot.session, repo, issue_id)
+        status, _ = await comment_issue(transport.github, repo, issue_id, " ".join(reason))
+        status, _ = await close_issue(transport.github, repo, issue_id)
         return status
 
     async def _reply_label(self, repo: str, issue_id: str, labels_base: List[str]) -> bool:
+        labels_final = await self._resolve_labels(repo, labels_base)
+        status, _ = await add_labels(transport.github, repo, issue_id, labels_final)
+        return status
+
+    async def _resolve_labels(self, repo: str, labels_base: List[str]) -> List[str]:
         labels_final = []
         _reading_complex_label = False
         _complex_label = ""
@@ -134,16 +257,21 @@ class Github(commands.Cog, name="Github"):
                 _complex_label += m_label
             else:
                 labels_final.append(m_label)
-        status, _ = await add_labels(self.bot.session, repo, issue_id, labels_final)
-        return status
+        # known labels are matched case-insensitively, unknown ones are created by github as they are
+        for i, label_name in enumerate(labels_final):
+            if label := await repo_metadata.label(transport.github, repo, label_name):
+                labels_final[i] = label["name"]
+        return labels_final
 
     async def _reply_milestone(self, repo: str, issue_id: str, milestones: List[str]) -> bool:
         logger.info(f"{milestones=}")
-        status, _ = await set_issue_milestone(self.bot.session, repo, issue_id, " ".join(milestones).replace('"', ''))
+        milestone = await repo_metadata.milestone(transport.github, repo, " ".join(milestones))
+        if not milestone:
+            return False
+        status, _ = await set_issue_milestone(transport.github, repo, issue_id, milestone["number"])
         return status
 
-    async def _send_feedback_reply(self, message: Message, replied_message: Message, steam_id: str, text_content: list):
-        feedback_text = replied_message.embeds[0].description.replace("```", "")
+    async def _send_feedback_reply(self, message: Message, feedback_text: str, steam_id: str, text_content: list):
         processed_text_content = ":".join(text_content).strip()
         attachments = {}
         # parse text content to find and process rewards line
@@ -181,22 +309,28 @@ class Github(commands.Cog, name="Github"):
             "textContent": final_text_content,
             "attachments": attachments
         }
-        result = await self.bot.session.post(
-            "https://chc-2.dota2unofficial.com/api/lua/mail/feedback_reply",
-            json=mail_data
-        )
-        await message.add_reaction("✅" if result.status < 400 else "🚫")
+        try:
+            async with transport.chc.post(
+                "https://chc-2.dota2unofficial.com/api/lua/mail/feedback_reply",
+                json=mail_data
+            ) as result:
+                status = result.status < 400
+        except (ClientError, asyncio.TimeoutError) as error:
+            logger.warning(f"[Feedback] mail to {steam_id} failed: {error!r}")
+            status = False
+        await message.add_reaction("✅" if status else "🚫")
 
     @commands.command()
     async def test_feedback_sending(self, context: Context, steam_id: str, text: str):
         split = text.split(":")
-        await self._send_feedback_reply(context.message, context.message, steam_id, split)
+        await self._send_feedback_reply(context.message, text, steam_id, split)
 
     @commands.command()
     async def feedback(self, context: Context):
         await context.send(f"""
 You can reply to feedback messages of bot in #chc_feedback channel to send ingame mails to players.
-Reply must start with `Send:`. It is possible to attach rewards to the message, adding reward line:
+Reply must start with `Send:`. If several feedback messages were packed together, add the position of the one
+you are replying to, like `Send 3:`. It is possible to attach rewards to the message, adding reward line:
 `Reward: 65 glory, 5 fortune, item_mail_test_2`. Reward line must be on new line, rewards should be 
 separated by `,`; order of wording in each reward is irrelevant (i.e. both `65 glory` and `glory 65` are valid).
 Casing of starting keywords is also irrelevant.
@@ -208,6 +342,10 @@ reward: -10000 glory, -1000 fortune, item_conscription_notification
         """.strip())
 
     async def process_github_links(self, message: Message):
+        with github_priority(Priority.UNFURL):
+            await self._process_github_links(message)
+
+    async def _process_github_links(self, message: Message):
         content = message.content
         links = re.findall(self.url_regex, content)
         links = [link[0] for link in links]
@@ -215,20 +353,24 @@ reward: -10000 glory, -1000 fortune, item_conscription_notification
             if link.endswith("/"):
                 link = link[:-1]
             repo_name, link_type, object_id = link.split("/")[-3:]
-            if repo_name not in self.private_repos:
+            # public repos are unfurled by discord itself
+            repo_record = repo_index.get(repo_name)
+            if not repo_record or not repo_record.private:
                 continue
             if link_type == "issues":
-                status, data = await get_issue_by_number(self.bot.session, repo_name, object_id)
+                status, data = await get_issue_by_number(transport.github, repo_name, object_id)
                 if not status:
                     continue
-                embed = await get_issue_embed(self.bot.session, data, object_id, repo_name, link)
-                await message.channel.send(embed=embed)
+                embed = await get_issue_embed(transport.github, data, object_id, repo_name, link)
+                sent = await message.channel.send(embed=embed)
+                await reply_targets.record_issue(sent.id, repo_name, object_id)
             elif link_type == "pull":
-                status, data = await get_pull_request_by_number(self.bot.session, repo_name, object_id)
+                status, data = await get_pull_request_by_number(transport.github, repo_name, object_id)
                 if not status:
                     continue
-                embed = await get_pull_request_embed(self.bot.session, data, object_id, repo_name, link)
-                await message.channel.send(embed=embed)
+                embed = await get_pull_request_embed(transport.github, data, object_id, repo_name, link)
+                sent = await message.channel.send(embed=embed)
+                await reply_targets.record_issue(sent.id, repo_name, object_id, "pulls")
 
     @commands.Cog.listener()
     async def on_reaction_add(self, reaction, user):
@@ -236,7 +378,6 @@ reward: -10000 glory, -1000 fortune, item_conscription_notification
             return
         message = reaction.message
         embed = message.embeds[0]
-        author = embed.author
 
         if not embed or message.author != self.bot.user:
             return
@@ -246,17 +387,27 @@ reward: -10000 glory, -1000 fortune, item_conscription_notification
 
         await message.remove_reaction(reaction.emoji, user)
 
-        params = [param.lower() for param in author.name.split(" ")]
-        if params[0] == "issues:":
-            page_number = int(embed.footer.text.split(" ")[1]) + PAGE_CONTROLS[reaction.emoji]
-            count = params[1]
-            state = params[2]
-            repo = params[4]
-            new_description = await get_issues_list(self.bot.session, repo, state, count, page_number)
+        cursor = await pager.load_cursor(message.id)
+        if not cursor:
+            return
+        page = max(1, cursor["page"] + PAGE_CONTROLS[reaction.emoji])
+        last_page = pager.last_page(cursor)
+        if last_page:
+            page = min(page, last_page)
+        if page == cursor["page"]:
+            return
 
-            title = f"Issues: {count} {state.capitalize()} in {repo}"
-            footer = f"Page: {page_number}"
-            await message.edit(embed=update_embed(embed, new_description, title, footer))
+        with github_priority(Priority.INTERACTIVE):
+            data = await pager.get_page(transport.github, cursor, page)
+        if data is None:
+            return
+        cursor["page"] = page
+        cursor["total"] = data.get("total", cursor.get("total"))
+        await asyncio.gather(
+            message.edit(embed=_paged_embed(cursor, data)),
+            pager.save_cursor(message.id, cursor),
+        )
+        pager.prefetch(transport.github, cursor, page + 1)
 
     @commands.command()
     @commands.has_permissions(manage_messages=True)
@@ -291,6 +442,7 @@ reward: -10000 glory, -1000 fortune, item_conscription_notification
     `$issue [repo name] "[title]" "[description]"` - open shortcut
     `$issue [command]` - bot guidance
     `$issue open war "Test" "Test"` - example of full command for issue opening
+    `$bulk` - close, label, milestone or assign many issues at once
             """
             embed.add_field(name="Usage", value=usage, inline=False)
             command_types = """
@@ -326,7 +478,110 @@ milestone: new round progress ui  // case insensitive
 
     @commands.command()
     async def update_repos(self, context: commands.Context):
-        await github_init(context.bot)
+        if await repo_index.refresh(transport.github):
+            await context.send(f"Indexed {len(repo_index.records)} repositories")
+        else:
+            await context.send("Failed to fetch repositories")
+
+    @commands.command()
+    @commands.has_permissions(manage_messages=True)
+    async def bulk(self, context: Context, *, text: str = ""):
+        repo_name, _, rest = text.strip().partition(" ")
+        targets, _, action_text = rest.partition("->")
+        action, _, argument = action_text.partition(":")
+        action, argument = action.strip().lower(), argument.strip()
+        if not targets.strip() or action not in _BULK_ACTIONS:
+            await context.send(_BULK_USAGE)
+            return
+        repo_record = repo_index.resolve(repo_name)
+        repo = repo_record.name if repo_record else preset_repos.get(repo_name.lower())
+        if not repo:
+            await context.send(f"Unknown repo `{repo_name}`. Here's possible ones:\n{repo_index.listing()}")
+            return
+
+        await context.trigger_typing()
+        operation, description = await self._prepare_bulk_action(repo, action, argument)
+        if not operation:
+            await context.send(description)
+            return
+        found = await find_targets(transport.github, repo, targets.strip())
+        if found is None:
+            await context.send("GitHub search failed, try again later")
+            return
+        issues, missing = found
+        if not issues:
+            await context.send("No issues match")
+            return
+        if len(issues) > BULK_MAX_ISSUES:
+            await context.send(f"More than {BULK_MAX_ISSUES} issues match, narrow the query down")
+            return
+
+        preview = "\n".join(format_issue_line(issue) for issue in issues[:_BULK_PREVIEW_LINES])
+        if len(issues) > _BULK_PREVIEW_LINES:
+            preview += f"\n...and {len(issues) - _BULK_PREVIEW_LINES} more"
+        embed = Embed(description=preview, timestamp=datetime.utcnow(), colour=colour.Colour.orange())
+        embed.set_author(name=f"Bulk {action} of {len(issues)} issues in {repo}",
+                         url=f"https://github.com/arcadia-redux/{repo}/issues")
+        embed.add_field(name="Action", value=description, inline=False)
+        if missing:
+            embed.add_field(name="Not found", value=" ".join(f"#{number}" for number in missing), inline=False)
+        embed.set_footer(text="Dry run. React with ✅ to apply, ❌ to cancel")
+        message = await context.send(embed=embed)
+        await asyncio.gather(message.add_reaction("✅"), message.add_reaction("❌"))
+
+        try:
+            reaction, _ = await self.bot.wait_for(
+                "reaction_add", timeout=120, check=lambda reaction, user: (
+                    user == context.author and reaction.message.id == message.id and reaction.emoji in ("✅", "❌")
+                )
+            )
+        except asyncio.TimeoutError:
+            reaction = None
+        await message.clear_reactions()
+        if not reaction or reaction.emoji != "✅":
+            embed.set_footer(text="Cancelled")
+            await message.edit(embed=embed)
+            return
+
+        async def report_progress(run: BulkRun):
+            embed.set_footer(text=f"{'Done' if run.finished else 'In progress'}: {run.done}/{run.total}, "
+                                  f"{len(run.failed)} failed")
+            if run.finished and run.failed:
+                failures = "\n".join(f"#{number}: {error[:80]}" for number, error in list(run.failed.items())[:10])
+                embed.add_field(name="Failed", value=failures, inline=False)
+            await message.edit(embed=embed)
+
+        logger.info(f"[Bulk] {context.author} runs {action} on {len(issues)} issues of {repo}")
+        await BulkRun(action, [issue["number"] for issue in issues], operation).run(report_progress)
+
+    async def _prepare_bulk_action(self, repo: str, action: str, argument: str) -> Tuple[Optional[Operation], str]:
+        # resolves action arguments once for all issues, returning operation and its description, or error text
+        session = transport.github
+        if action == "close":
+            async def close(number: int):
+                if argument:
+                    status, details = await comment_issue(session, repo, number, argument)
+                    if not status:
+                        return status, details
+                return await close_issue(session, repo, number)
+            return close, f"Close{f' with comment: {argument}' if argument else ''}"
+        if action == "label":
+            labels = await self._resolve_labels(repo, argument.split())
+            if not labels:
+                return None, "No labels given"
+            return lambda number: append_labels(session, repo, number, labels), f"Add labels: {', '.join(labels)}"
+        if action == "milestone":
+            milestone = await repo_metadata.milestone(session, repo, argument)
+            if not milestone:
+                return None, f"Unknown milestone `{argument}`"
+            return lambda number: set_issue_milestone(session, repo, number, milestone["number"]), \
+                f"Set milestone: {milestone['title']}"
+        assignees = await self._resolve_assignees(argument.split())
+        if not assignees or not all(assignees):
+            return None, "Give github names, or mentions of people with `$add_github_name` set"
+        if unknown := repo_metadata.unknown_assignees(assignees):
+            return None, f"Not members of the team: {', '.join(sorted(unknown))}"
+        return lambda number: assign_issue(session, repo, number, assignees), f"Assign: {', '.join(assignees)}"
 
     async def handle_bot_command(self, context, action, *args):
         args_len = len(args)
@@ -344,12 +599,17 @@ milestone: new round progress ui  // case insensitive
             else:
                 repo = await get_argument(
                     context,
-                    f"In which repo? Here's possible ones:\n{self.repos_stringified_list}"
+                    f"In which repo? Here's possible ones:\n{repo_index.listing()}"
                 )
-            if repo.lower() in preset_repos:
+            if not repo:
+                return
+            if repo_record := repo_index.resolve(repo):
+                repo = repo_record.name
+            elif repo.lower() in preset_repos:
                 repo = preset_repos[repo.lower()]
-        if not repo:
-            return
+            elif repo_index:
+                await context.send(f"Unknown repo `{repo}`. Here's possible ones:\n{repo_index.listing()}")
+                return
         await context.trigger_typing()
         for aliases, coro in self.command_list:
             if action in aliases:
@@ -361,30 +621,13 @@ milestone: new round progress ui  // case insensitive
         if '-closed' in args: state = "closed"
         if '-all' in args: state = "all"
 
-        count = 10
-        page = 1
-
-        embed = Embed(
-            description=await get_issues_list(context.bot.session, repo, state, count, page),
-            timestamp=datetime.utcnow(),
-            colour=colour.Color.dark_teal()
-        )
-
-        embed.set_author(
-            name=f"Issues: {count} {state.capitalize()} in {repo}",
-            url=f"https://github.com/arcadia-redux/{repo}/issues",
-            icon_url="https://cdn.discordapp.com/attachments/684952282076282882/838854388201553930/123.png"
-        )
-
-        embed.set_footer(text=f"Page: {page}")
-
-        message = await context.send(embed=embed)
-        await asyncio.gather(*[message.add_reaction("⏮"), message.add_reaction("⏭")])
+        cursor = {"kind": "list", "repo": repo, "state": state, "page": 1, "per_page": 10}
+        await _send_paged(context, cursor)
 
     @staticmethod
     async def _close_issue(context: Context, repo: str, args: List[str], args_len: int) -> None:
         issue_id = args[1] if args_len > 1 else await get_argument(context, "Waiting for issue id:")
-        status, detail = await close_issue(context.bot.session, repo, issue_id)
+        status, detail = await close_issue(transport.github, repo, issue_id)
         if status:
             await context.send(f"Successfully closed issue **#{issue_id}** of **{repo}**")
         else:
@@ -403,7 +646,7 @@ milestone: new round progress ui  // case insensitive
                 argument += '\n '
             title, body = argument.split("\n")
         if context.message.attachments:
-            body += await process_attachments(context, context.message.attachments[0].url)
+            body += await process_attachments(context, context.message.attachments)
         status, details = await open_issue(context, repo, title, body)
 
         if status:
@@ -417,7 +660,8 @@ milestone: new round progress ui  // case insensitive
                 name=f"Opened issue #{details['number']} in {repo}",
                 url=details['html_url']
             )
-            await context.send(embed=embed)
+            sent = await context.send(embed=embed)
+            await reply_targets.record_issue(sent.id, repo, details["number"])
         else:
             await context.reply(f"GitHub error occurred:\n{details}.")
 
@@ -444,7 +688,7 @@ milestone: new round progress ui  // case insensitive
     async def _attach_image(context: Context, repo: str, args: List[str], args_len: int) -> None:
         issue_id = args[1] if args_len > 1 else await get_argument(context, "Waiting for issue id:")
         if context.message.attachments:
-            attachment = context.message.attachments[0]
+            attachments = context.message.attachments
         else:
             message = await context.send("Awaiting for attachment.")
             try:
@@ -459,12 +703,12 @@ milestone: new round progress ui  // case insensitive
             if not result.attachments:
                 await message.delete()
                 return
-            attachment = result.attachments[0]
+            attachments = result.attachments
         status, comment_data = await comment_issue(
-            context.bot.session,
+            transport.github,
             repo,
             issue_id,
-            comment_wrap(await process_attachments(context, attachment.url), context)
+            comment_wrap(await process_attachments(context, attachments), context)
         )
         if status:
             await context.send(f"Successfully added comment {comment_data['html_url']}")
@@ -475,7 +719,7 @@ milestone: new round progress ui  // case insensitive
     async def _comment_issue(context: Context, repo: str, args: List[str], args_len: int) -> None:
         issue_id = args[1] if args_len > 1 else await get_argument(context, "Waiting for issue id:")
         content = args[2] if args_len > 2 else await get_argument(context, "Waiting for comment text:")
-        status, comment_data = await comment_issue(context.bot.session, repo, issue_id, comment_wrap(content, context))
+        status, comment_data = await comment_issue(transport.github, repo, issue_id, comment_wrap(content, context))
         if status:
             await context.send(f"Successfully added comment {comment_data['html_url']}")
         else:
@@ -486,7 +730,10 @@ milestone: new round progress ui  // case insensitive
         logger.info("assign called")
         issue_id = args[1] if args_len > 1 else await get_argument(context, "Waiting for issue id:")
         assignees = args[2:] if args_len > 2 else (await get_argument(context, "Waiting for assignees: ")).split(" ")
-        status, details = await assign_issue(context.bot.session, repo, issue_id, assignees)
+        if unknown := repo_metadata.unknown_assignees(assignees):
+            await context.send(f"Not members of the team: **{', '.join(sorted(unknown))}**")
+            return
+        status, details = await assign_issue(transport.github, repo, issue_id, assignees)
         if status:
             await context.send(f"Successfully assigned **{', '.join(assignees)}** to issue **{issue_id}**")
         else:
@@ -498,69 +745,75 @@ milestone: new round progress ui  // case insensitive
             query = " ".join(args[1:])
         else:
             query = await get_argument(context, "Waiting for search query:")
-        status, details = await search_issues(context.bot.session, repo, query)
-
-        if not status:
-            await context.send(f"Github error occurred:\n```{details}```")
-            return
-
-        results = details["total_count"]
-        description = []
-        for item in details["items"]:
-            link = f"[`#{item['number']}`]({item['html_url']})"
-            issue_state = "🟢" if item['state'] == "open" else "🔴"
-            description.append(
-                f"{issue_state} {link} {item['title']}"
-            )
-
-        description.append(
-            f"\n[`How to compose queries`](https://docs.github.com/en/github/searching-for-information-on-github/searching-on-github/searching-issues-and-pull-requests#search-only-issues-or-pull-requests)")
-
-        embed = Embed(
-            title=f"Total search results: {results} {'listing 10' if results > 10 else ''}",
-            description="\n".join(description),
-            timestamp=datetime.utcnow(),
-            colour=colour.Colour.blurple(),
-        )
-        embed.set_author(name=f"Search in {repo}", url=f"https://github.com/arcadia-redux/{repo}")
-        await context.send(embed=embed)
+        cursor = {"kind": "search", "repo": repo, "query": query, "page": 1, "per_page": 10}
+        await _send_paged(context, cursor)
 
     @commands.command()
     async def test_scan(self, context: Context):
-        await self._search_old_issues_in_repo_with_label("custom_hero_clash_issues", '"unknown cause"')
+        await self._scan_stale_issues({"custom_hero_clash_issues"}, ['"unknown cause"'])
 
-    async def _search_old_issues_in_repo_with_label(self, repo_name: str, label_name: str):
-        logger.info(f"[Scan] Scanning old issues in {repo_name} / {label_name}")
-        status, data = await search_issues(self.bot.session, repo_name, f"is:open label:{label_name}", per_page=50)
-        if not status:
-            logger.warning(f"[Scan] Issue search failed: {data}")
+    async def _ensure_warning_label(self, repo_name: str):
+        if await repo_metadata.label(transport.github, repo_name, _WarningLabelName):
             return
-        run_time = datetime.utcnow()
-
-        for issue in data["items"]:
-            await asyncio.sleep(1)
-            issue_number = issue["number"]
+        status, label = await create_repo_label(
+            transport.github, repo_name, _WarningLabelName, "FF4000",
+            "This issue will be closed soon for inactivity and missing replication"
+        )
+        if status:
+            repo_metadata.add_label(repo_name, label)
 
-            present_labels = [label["name"] for label in issue["labels"]]
-            has_warning_label = _WarningLabelName in present_labels
+    async def _scan_stale_issues(self, repos: Set[str], labels: List[str]):
+        await asyncio.gather(*[self._ensure_warning_label(repo_name) for repo_name in repos])
 
-            last_action_date = issue.get("updated_at", issue["created_at"])
-            updated_at = datetime.strptime(last_action_date, "%Y-%m-%dT%H:%M:%SZ")
-            date_difference = run_time - updated_at
-            if date_difference.days < 7:
+        # github search query doesn't support logical OR for labels, so it is one org-wide search per label
+        searches = await asyncio.gather(
+            *[search_org_issues(transport.github, f"is:open label:{label_name}") for label_name in labels]
+        )
+        issues_by_repo: Dict[str, Dict[int, Tuple[dict, str]]] = defaultdict(dict)
+        for label_name, (status, items) in zip(labels, searches):
+            if not status:
+                logger.warning(f"[Scan] Issue search of {label_name} failed: {items}")
                 continue
+            for issue in items:
+                repo_name = issue["repository_url"].split("/")[-1]
+                if repo_name in repos:
+                    # issue with several scanned labels is handled once, by the first one of them
+                    issues_by_repo[repo_name].setdefault(issue["number"], (issue, label_name))
+
+        run_time = datetime.utcnow()
+        semaphore = asyncio.Semaphore(_SCAN_CONCURRENCY)
+        jobs = []
+        for repo_name, issues in issues_by_repo.items():
+            logger.info(f"[Scan] {len(issues)} labeled open issues in {repo_name}")
+            for issue, label_name in issues.values():
+                jobs.append(self._process_stale_issue(semaphore, repo_name, issue, label_name, run_time))
+        await asyncio.gather(*jobs)
+
+    async def _process_stale_issue(self, semaphore: asyncio.Semaphore, repo_name: str, issue: dict,
+                                   label_name: str, run_time: datetime):
+        issue_number = issue["number"]
+
+        present_labels = [label["name"] for label in issue["labels"]]
+        has_warning_label = _WarningLabelName in present_labels
+
+        last_action_date = issue.get("updated_at", issue["created_at"])
+        updated_at = datetime.strptime(last_action_date, "%Y-%m-%dT%H:%M:%SZ")
+        date_difference = run_time - updated_at
+        if date_difference.days < 7:
+            return
 
+        async with semaphore:
             if not has_warning_label:
-                logger.info(f"[Scan] Outdated issue {issue_number}, adding label")
+                logger.info(f"[Scan] Outdated issue {repo_name}#{issue_number}, adding label")
 
                 status, _data = await add_labels(
-                    self.bot.session, repo_name, issue_number, [_WarningLabelName, *present_labels]
+                    transport.github, repo_name, issue_number, [_WarningLabelName, *present_labels]
                 )
                 if not status:
                     logger.warning(f"[Scan] Error when adding labels to issue {issue_number}, {_data}")
 
                 status, _data = await comment_issue(
-                    self.bot.session, repo_name, issue_number,
+                    transport.github, repo_name, issue_number,
                     f"## Warning  \nThis issue was inactive for **{date_difference.days}** days "
                     f"with label {label_name}.  "
                     f"\nIt will be **closed** automatically after **7** days if this issue stays inactive."
@@ -568,23 +821,36 @@ milestone: new round progress ui  // case insensitive
                 if not status:
                     logger.warning(f"[Scan] Error when adding labels to issue {issue_number}, {_data}")
             else:
-                status, _data = await close_issue(self.bot.session, repo_name, issue_number)
+                status, _data = await close_issue(transport.github, repo_name, issue_number)
                 if not status:
                     logger.warning(f"[Scan] Failed to close issue {issue_number} in scan: {_data}")
 
+    @tasks.loop(minutes=15, reconnect=True)
+    async def refresh_metadata(self):
+        with github_priority(Priority.BACKGROUND):
+            await repo_metadata.refresh(transport.github, preset_repos.values())
+
+    @tasks.loop(minutes=30, reconnect=True)
+    async def refresh_repos(self):
+        with github_priority(Priority.BACKGROUND):
+            await repo_index.refresh(transport.github)
+
+    @tasks.loop(minutes=30, reconnect=True)
+    async def sync_issue_index(self):
+        with github_priority(Priority.BACKGROUND):
+            if not repo_index:
+                await repo_index.refresh(transport.github)
+            await issue_index.sync(
+                transport.github, [record.name for record in repo_index.records
+                                   if record.name not in excluded_global_repos]
+            )
+
     @tasks.loop(hours=4, reconnect=True)
     async def scan_old_issues(self):
-        logger.info("[Scan] Started")
-        for _, repo_name in preset_repos.items():
-            label_exists, _ = await get_repo_single_label(self.bot.session, repo_name, _WarningLabelName)
+        with github_priority(Priority.BACKGROUND):
+            await self._scan_old_issues()
 
-            if not label_exists:
-                await create_repo_label(
-                    self.bot.session, repo_name, "[Auto] Cleanup warned", "FF4000",
-                    "This issue will be closed soon for inactivity and missing replication"
-                )
-            # github search query doesn't support logical OR for labels, therefore have to iterate over all of them
-            for label_name in ['"unknown cause"', '"needs confirmation"', f'"{_WarningLabelName}"']:
-                await self._search_old_issues_in_repo_with_label(repo_name, label_name)
-                await asyncio.sleep(10)  # solid sleep to ensure we aren't exceeding rate limits
+    async def _scan_old_issues(self):
+        logger.info("[Scan] Started")
+        await self._scan_stale_issues(set(preset_repos.values()), _ScanLabels)
         logger.info("[Scan] Finished")
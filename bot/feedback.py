@@ -0,0 +1,74 @@
+import asyncio
+import datetime
+import json
+from functools import partial
+
+import discord
+from loguru import logger
+
+from . import translator
+from .reply_targets import reply_targets
+
+
+@logger.catch
+async def read_pubsub(bot, receiver):
+    async for _, message in receiver.iter():
+        try:
+            decoded = json.loads(message[1])
+        except (ValueError, TypeError):
+            logger.warning(f"Malformed feedback message in {message[0]}: {message[1]!r}")
+            continue
+        await bot.feedback_pool.put(decoded.get("custom_game", ""), decoded)
+    logger.info("finished reading!")
+
+
+# errors propagate to feedback pool, which counts the message as failed and leaves its stream entry unacknowledged
+async def prepare_suggestion(bot, decoded: dict):
+    custom_game = decoded["custom_game"]
+    steam_id = decoded["steam_id"]
+    text = decoded["text"]
+
+    logger.info(f"Message from channel {custom_game} by {steam_id}: {text}")
+
+    report_channel = bot.report_channels.get(custom_game, None)
+    if not report_channel:
+        logger.warning(f"[Feedback] no report channel for {custom_game}, message from {steam_id} is not posted")
+        raise LookupError(f"no report channel for {custom_game}")
+
+    translated, language = await translator.translate(text)
+
+    profile_avatar_link, profile_name = None, None
+    if steam_profile := await bot.steam_profiles.get(steam_id):
+        profile_avatar_link = steam_profile["avatar"]
+        profile_name = steam_profile["name"]
+
+    embed = discord.Embed(
+        timestamp=datetime.datetime.utcnow(),
+        description=f'```{decoded["text"].strip()}```',
+    )
+    embed.set_author(
+        name=profile_name,
+        url=f"https://steamcommunity.com/profiles/{steam_id}",
+        icon_url=profile_avatar_link or ""
+    )
+    if translated:
+        embed.add_field(name=f"Translation from **{language.upper()}**", value=f"```{translated}```")
+
+    if custom_game == "CustomHeroClash" and steam_id:
+        embed.add_field(
+            name=f"🌟 Reward 🌟",
+            value="\t|\t".join(
+                f"[{i}<:fortune:831077783446749194>](https://chc-2.dota2unofficial.com/api/lua/mail/feedback"
+                f"?steam_id={steam_id}&fortune_value={i})" for i in
+                [5, 10, 25, 50, 100]),
+            inline=False
+        )
+
+    return report_channel, embed, steam_id, text.strip()
+
+
+async def send_suggestion(bot, prepared) -> asyncio.Future:
+    report_channel, embed, steam_id, text = prepared
+    sent = bot.outbound.enqueue(report_channel, embed)
+    sent.add_done_callback(partial(reply_targets.record_sent_feedback, steam_id=steam_id, text=text))
+    return sent
@@ -0,0 +1,159 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Final, List, Optional
+
+from loguru import logger
+from arcadia_common import metrics
+
+_LATENCY_SAMPLES: Final = 500
+
+_processed_total = metrics.counter("feedback_processed_total", "Processed feedback messages", ["result"])
+_wait_seconds = metrics.histogram("feedback_wait_seconds", "Time feedback spent in queue before a worker took it")
+_latency_seconds = metrics.histogram(
+    "feedback_latency_seconds", "Time from feedback being received to being posted", buckets=(
+        0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+    )
+)
+
+
+def _percentile(samples: List[float], percent: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# Bounded queue drained by several workers. `prepare` runs concurrently, while `deliver` is called strictly
+# in arrival order for items sharing the same key (custom game), so report channels keep feedback order
+class FeedbackPool:
+    def __init__(self, prepare: Callable[[Any], Awaitable[Any]], deliver: Callable[[Any], Awaitable[None]],
+                 workers: int = 4, max_depth: int = 500):
+        self.prepare = prepare
+        self.deliver = deliver
+        self.worker_count = max(1, workers)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, max_depth))
+        self.workers: List[asyncio.Task] = []
+
+        self._tails: Dict[str, asyncio.Future] = {}
+        self.in_flight = 0
+        self.processed = 0
+        self.failed = 0
+        self.wait_times: Deque[float] = deque(maxlen=_LATENCY_SAMPLES)
+        self.total_times: Deque[float] = deque(maxlen=_LATENCY_SAMPLES)
+
+    def start(self):
+        if self.workers:
+            return
+        self.workers = [asyncio.ensure_future(self._worker(i)) for i in range(self.worker_count)]
+        logger.info(f"[Feedback] started {self.worker_count} workers, queue size {self.queue.maxsize}")
+
+    async def stop(self):
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    # `on_done` is awaited with a single argument - whether item was delivered successfully
+    async def put(self, key: str, item: Any, on_done: Optional[Callable[[bool], Awaitable[None]]] = None):
+        if self.queue.full():
+            logger.warning(f"[Feedback] queue is full ({self.queue.qsize()}), reader is waiting for workers")
+
+        # chain items of the same key, so they are delivered in order they were received
+        loop = asyncio.get_event_loop()
+        previous = self._tails.get(key)
+        own = loop.create_future()
+        self._tails[key] = own
+        own.add_done_callback(lambda fut: self._release_tail(key, fut))
+
+        try:
+            await self.queue.put((time.monotonic(), item, previous, own, on_done))
+        except asyncio.CancelledError:
+            own.set_result(None)
+            raise
+
+    def _release_tail(self, key: str, future: asyncio.Future):
+        if self._tails.get(key) is future:
+            del self._tails[key]
+
+    async def _worker(self, index: int):
+        while True:
+            enqueued_at, item, previous, own, on_done = await self.queue.get()
+            self.wait_times.append(time.monotonic() - enqueued_at)
+            _wait_seconds.observe(self.wait_times[-1])
+            self.in_flight += 1
+            receipt = None
+            try:
+                prepared = await self.prepare(item)
+                if previous is not None:
+                    await asyncio.shield(previous)
+                # `deliver` may hand item over to an outbound queue, returning future that completes once it is sent;
+                # next item of the same key can be handed over right away, order is kept by that queue
+                receipt = await self.deliver(prepared)
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                logger.exception(f"[Feedback] worker {index} failed to process message")
+                receipt = asyncio.get_event_loop().create_future()
+                receipt.set_exception(error)
+            finally:
+                self.in_flight -= 1
+                if not own.done():
+                    own.set_result(None)
+                self.queue.task_done()
+
+            if receipt is None or receipt.done():
+                await self._complete(receipt, enqueued_at, on_done)
+            else:
+                asyncio.ensure_future(self._complete(receipt, enqueued_at, on_done))
+
+    async def _complete(self, receipt: Optional[asyncio.Future], enqueued_at: float,
+                        on_done: Optional[Callable[[bool], Awaitable[None]]]):
+        delivered = True
+        if receipt is not None:
+            try:
+                await receipt
+            except Exception:
+                delivered = False
+        if delivered:
+            self.processed += 1
+        else:
+            self.failed += 1
+        _processed_total.inc(result="delivered" if delivered else "failed")
+        self.total_times.append(time.monotonic() - enqueued_at)
+        _latency_seconds.observe(self.total_times[-1])
+        if on_done:
+            try:
+                await on_done(delivered)
+            except Exception:
+                logger.exception(f"[Feedback] completion callback failed")
+
+    def stats(self) -> dict:
+        wait_times = list(self.wait_times)
+        total_times = list(self.total_times)
+        return {
+            "workers": len(self.workers),
+            "depth": self.queue.qsize(),
+            "max_depth": self.queue.maxsize,
+            "in_flight": self.in_flight,
+            "processed": self.processed,
+            "failed": self.failed,
+            "wait_p50": _percentile(wait_times, 50),
+            "wait_p95": _percentile(wait_times, 95),
+            "latency_p50": _percentile(total_times, 50),
+            "latency_p95": _percentile(total_times, 95),
+            "latency_max": max(total_times, default=0.0),
+        }
+
+    def stats_text(self) -> str:
+        stats = self.stats()
+        return "\n".join([
+            f"Workers:     {stats['workers']}",
+            f"Queue depth: {stats['depth']} / {stats['max_depth']}",
+            f"In flight:   {stats['in_flight']}",
+            f"Processed:   {stats['processed']} (failed: {stats['failed']})",
+            f"Wait p50/95: {stats['wait_p50'] * 1000:.0f}ms / {stats['wait_p95'] * 1000:.0f}ms",
+            f"Total p50/95/max: {stats['latency_p50'] * 1000:.0f}ms / {stats['latency_p95'] * 1000:.0f}ms / "
+            f"{stats['latency_max'] * 1000:.0f}ms",
+        ])
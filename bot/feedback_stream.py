@@ -0,0 +1,143 @@
+import asyncio
+import json
+import os
+import socket
+from typing import Final, List, Set, Tuple
+
+from aioredis.errors import ReplyError
+from loguru import logger
+
+from .feedback_pool import FeedbackPool
+
+STREAM_PREFIX: Final = "suggestions-stream:"
+GROUP_NAME: Final = "discord-bot"
+
+_READ_COUNT: Final = 50
+_BLOCK_MS: Final = 5000
+_CLAIM_IDLE_MS: Final = 60 * 1000
+_CLAIM_INTERVAL: Final = 30
+_MAX_DELIVERIES: Final = 5
+
+
+# Reads feedback from redis streams (one per custom game) as a member of `discord-bot` consumer group.
+# Entries are acknowledged only after feedback was delivered, so anything left unacknowledged by a crashed or
+# restarted replica is picked up again - either by the same consumer on startup, or reclaimed by another one
+class FeedbackStreamConsumer:
+    def __init__(self, redis, pool: FeedbackPool, streams: List[str], consumer_name: str = None):
+        self.redis = redis
+        self.pool = pool
+        self.streams = streams
+        # stable name lets restarted replica pick its own unacknowledged entries up right away
+        self.consumer = consumer_name or os.getenv("FEEDBACK_CONSUMER", socket.gethostname())
+
+        self._in_flight: Set[Tuple[bytes, bytes]] = set()
+        self.received = 0
+        self.acked = 0
+        self.reclaimed = 0
+        self.dropped = 0
+
+    async def setup(self):
+        for stream in self.streams:
+            try:
+                # new group starts from the beginning of the stream, catching up on backlog created before it
+                await self.redis.xgroup_create(stream, GROUP_NAME, latest_id="0", mkstream=True)
+                logger.info(f"[Streams] created consumer group for {stream}")
+            except ReplyError as error:
+                if "BUSYGROUP" not in str(error):
+                    raise
+
+    @logger.catch
+    async def run(self):
+        await self.setup()
+        logger.info(f"[Streams] consuming {len(self.streams)} streams as {self.consumer}")
+        await self._read_own_pending()
+        await self._reclaim()
+
+        loop = asyncio.get_event_loop()
+        last_claim = loop.time()
+        while True:
+            try:
+                # blocking read takes a connection of its own, other commands sharing pooled one would wait behind it;
+                # `>` asks for entries never delivered to any consumer of the group
+                with await self.redis as connection:
+                    entries = await connection.xread_group(
+                        GROUP_NAME, self.consumer, self.streams, timeout=_BLOCK_MS, count=_READ_COUNT,
+                        latest_ids=[">"] * len(self.streams)
+                    )
+            except (ConnectionError, ReplyError) as error:
+                logger.warning(f"[Streams] read failed: {error!r}, retrying")
+                await asyncio.sleep(1)
+                continue
+            for stream, entry_id, fields in entries:
+                await self._dispatch(stream, entry_id, fields)
+
+            if loop.time() - last_claim > _CLAIM_INTERVAL:
+                last_claim = loop.time()
+                try:
+                    await self._reclaim()
+                except (ConnectionError, ReplyError) as error:
+                    logger.warning(f"[Streams] reclaim failed: {error!r}")
+
+    async def _read_own_pending(self):
+        # entries delivered to this consumer before restart, but never acknowledged
+        for stream in self.streams:
+            last_id = "0"
+            while True:
+                entries = await self.redis.xread_group(
+                    GROUP_NAME, self.consumer, [stream], count=_READ_COUNT, latest_ids=[last_id]
+                )
+                if not entries:
+                    break
+                for _stream, entry_id, fields in entries:
+                    last_id = entry_id
+                    await self._dispatch(_stream, entry_id, fields)
+                if len(entries) < _READ_COUNT:
+                    break
+
+    async def _reclaim(self):
+        for stream in self.streams:
+            pending = await self.redis.xpending(stream, GROUP_NAME, "-", "+", 100)
+            to_claim = []
+            for entry_id, consumer, idle, deliveries in pending:
+                if idle < _CLAIM_IDLE_MS or (stream.encode(), entry_id) in self._in_flight:
+                    continue
+                if deliveries >= _MAX_DELIVERIES:
+                    logger.warning(f"[Streams] dropping {stream}:{entry_id} after {deliveries} deliveries")
+                    await self.redis.xack(stream, GROUP_NAME, entry_id)
+                    self.dropped += 1
+                    continue
+                to_claim.append(entry_id)
+            if not to_claim:
+                continue
+            claimed = await self.redis.xclaim(stream, GROUP_NAME, self.consumer, _CLAIM_IDLE_MS, *to_claim)
+            logger.info(f"[Streams] reclaimed {len(claimed)} idle entries of {stream}")
+            self.reclaimed += len(claimed)
+            for entry_id, fields in claimed:
+                await self._dispatch(stream, entry_id, fields)
+
+    async def _dispatch(self, stream, entry_id: bytes, fields: dict):
+        stream_key = stream.encode() if isinstance(stream, str) else stream
+        if (stream_key, entry_id) in self._in_flight:
+            return
+        self.received += 1
+        try:
+            decoded = json.loads(fields[b"data"])
+        except (KeyError, ValueError, TypeError):
+            logger.warning(f"[Streams] malformed entry {stream}:{entry_id}: {fields!r}")
+            await self.redis.xack(stream_key, GROUP_NAME, entry_id)
+            self.dropped += 1
+            return
+
+        self._in_flight.add((stream_key, entry_id))
+
+        async def acknowledge(delivered: bool):
+            self._in_flight.discard((stream_key, entry_id))
+            if delivered:
+                await self.redis.xack(stream_key, GROUP_NAME, entry_id)
+                self.acked += 1
+
+        await self.pool.put(decoded.get("custom_game", ""), decoded, on_done=acknowledge)
+
+    def stats_text(self) -> str:
+        return f"Streams ({self.consumer}): {self.received} received, {self.acked} acked, " \
+               f"{self.reclaimed} reclaimed, {self.dropped} dropped"
@@ -0,0 +1,135 @@
+import json
+import re
+import time
+from hashlib import sha256
+from typing import Dict, Final, Mapping, Optional, Set
+
+from cachetools import LRUCache
+from loguru import logger
+from arcadia_common import metrics
+
+from .change_tracker import exclude_from_backups
+
+_REDIS_PREFIX: Final = "github_cache:"
+exclude_from_backups(_REDIS_PREFIX)
+_SCOPE_PREFIX: Final = f"{_REDIS_PREFIX}scope:"
+_REDIS_TTL: Final = 86400
+_MAX_AGE_REGEX: Final = re.compile(r"max-age=(\d+)")
+
+_requests_total = metrics.counter(
+    "github_cache_requests_total", "Cacheable GitHub GET requests by cache result", ["result"]
+)
+
+
+def cache_key(authorization: str, url: str, params: Optional[Mapping] = None) -> str:
+    # responses differ per user (private repos, permissions), so auth identity is a part of the key
+    query = "&".join(f"{name}={value}" for name, value in sorted((params or {}).items()))
+    return sha256(f"{authorization}\n{url}?{query}".encode("utf-8")).hexdigest()
+
+
+def max_age(headers: Mapping[str, str]) -> int:
+    match = _MAX_AGE_REGEX.search(headers.get("Cache-Control", ""))
+    return int(match.group(1)) if match else 0
+
+
+# Stores bodies of GitHub GET responses along with their validators (ETag / Last-Modified). Responses are served
+# without a request while `max-age` lasts, afterwards they are revalidated with conditional request:
+# 304 Not Modified doesn't count against rate limit
+class GithubResponseCache:
+    def __init__(self, size: int = 2000):
+        self.memory = LRUCache(maxsize=size)
+        self.redis = None
+        # keys of cached lists and searches by what they cover (repo name, or `org` for org-wide searches),
+        # a mutation invalidates all of them at once
+        self.scopes: Dict[str, Set[str]] = {}
+
+        self.hits = 0
+        self.not_modified = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[dict]:
+        entry = self.memory.get(key)
+        if entry is None and self.redis:
+            try:
+                raw = await self.redis.get(f"{_REDIS_PREFIX}{key}")
+            except Exception:
+                logger.exception("[GitHub] failed to read response cache")
+                return None
+            if raw:
+                entry = self.memory[key] = json.loads(raw)
+        return entry
+
+    async def put(self, key: str, entry: dict, scope: Optional[str] = None):
+        self.memory[key] = entry
+        if scope:
+            self.scopes.setdefault(scope, set()).add(key)
+        if self.redis:
+            try:
+                transaction = self.redis.multi_exec()
+                transaction.setex(f"{_REDIS_PREFIX}{key}", _REDIS_TTL, json.dumps(entry))
+                if scope:
+                    transaction.sadd(f"{_SCOPE_PREFIX}{scope}", key)
+                    transaction.expire(f"{_SCOPE_PREFIX}{scope}", _REDIS_TTL)
+                await transaction.execute()
+            except Exception:
+                logger.exception("[GitHub] failed to write response cache")
+
+    async def invalidate(self, key: str):
+        self.memory.pop(key, None)
+        if self.redis:
+            await self.redis.delete(f"{_REDIS_PREFIX}{key}")
+
+    async def invalidate_scope(self, scope: str):
+        keys = self.scopes.pop(scope, set())
+        if self.redis:
+            keys |= set(await self.redis.smembers(f"{_SCOPE_PREFIX}{scope}", encoding="utf-8"))
+        for key in keys:
+            self.memory.pop(key, None)
+        if self.redis:
+            await self.redis.delete(f"{_SCOPE_PREFIX}{scope}", *[f"{_REDIS_PREFIX}{key}" for key in keys])
+
+    @staticmethod
+    def is_fresh(entry: dict) -> bool:
+        return entry["expires_at"] > time.time()
+
+    @staticmethod
+    def conditional_headers(entry: Optional[dict]) -> dict:
+        if not entry:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    @staticmethod
+    def make_entry(headers: Mapping[str, str], body: str) -> Optional[dict]:
+        etag, last_modified = headers.get("ETag"), headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return None
+        return {
+            "etag": etag,
+            "last_modified": last_modified,
+            "body": body,
+            "expires_at": time.time() + max_age(headers),
+        }
+
+    def record(self, result: str):
+        if result == "hit":
+            self.hits += 1
+        elif result == "not_modified":
+            self.not_modified += 1
+        else:
+            self.misses += 1
+        _requests_total.inc(result=result)
+
+    def stats_text(self) -> str:
+        return f"GitHub cache: {self.hits} fresh hits, {self.not_modified} revalidated (304), {self.misses} misses"
+
+
+cache = GithubResponseCache()
+
+
+def attach_redis(redis):
+    cache.redis = redis
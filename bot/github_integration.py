@@ -1,11 +1,20 @@
+import asyncio
+import json
+import re
+import time
 from base64 import b64encode
 from os import getenv
-from typing import Optional, List, Tuple, Union
-from aiohttp import ClientSession
+from typing import Dict, Iterable, Optional, List, Mapping, Set, Tuple, Union
+from aiohttp import ClientError, ClientSession
 
 from discord.ext.commands import Context
 from loguru import logger
+from arcadia_common import metrics
 from .enums import ApiRequestKind
+from .github_cache import cache, cache_key, max_age
+from .github_objects import objects
+from .github_scheduler import MAX_RETRY_WAIT, current_priority, resource_of, scheduler
+from .transport import transport
 
 login = getenv("GITHUB_LOGIN")
 password = getenv("GITHUB_KEY")
@@ -16,8 +25,6 @@ base_api_headers = {
     "Authorization": f"Basic {auth_string}",
     "Accept": "application/vnd.github.v3+json",
 }
-repositories = []
-
 preset_repos = {
     "chc": "custom_hero_clash_issues",
     "12v12": "12v12",
@@ -34,12 +41,67 @@ excluded_global_repos = {
     "aghslab2", "contest.dota2unofficial.com"
 }
 
+_GRAPHQL_REFERENCES_PER_QUERY = 50
+_MAX_ATTEMPTS = 3
+_SEARCH_PAGE_SIZE = 100
+_SEARCH_MAX_RESULTS = 1000
+_LIST_PAGE_SIZE = 100
+
 _Numeric = Union[str, int]
 _ApiResponse = Tuple[bool, Union[dict, list]]
 
-
-async def github_init(bot) -> str:
-    return await get_repos(bot)
+_requests_total = metrics.counter(
+    "github_requests_total", "GitHub API requests by endpoint and response status", ["method", "endpoint", "status"]
+)
+_request_seconds = metrics.histogram(
+    "github_request_seconds", "GitHub API request latency by endpoint", ["method", "endpoint"]
+)
+
+# collapsing ids and names in request paths, so metrics are grouped per endpoint
+_endpoint_patterns = [
+    (re.compile(r"^/repos/arcadia-redux/[^/]+"), "/repos/{repo}"),
+    (re.compile(r"/compare/.+$"), "/compare/{range}"),
+    (re.compile(r"/labels/.+$"), "/labels/{name}"),
+    (re.compile(r"/commits/[^/]+$"), "/commits/{sha}"),
+    (re.compile(r"/\d+(?=/|$)"), "/{id}"),
+]
+
+
+_object_path_regex = re.compile(r"^/repos/arcadia-redux/([^/]+)/(?:issues|pulls)/(\d+)")
+_repo_path_regex = re.compile(r"^/repos/arcadia-redux/([^/]+)/")
+_search_repo_regex = re.compile(r"\brepo:arcadia-redux/(\S+)")
+
+
+def cache_scope(request_path: str, params: Optional[dict]) -> Optional[str]:
+    # what a cached response covers, so that changes under it invalidate the response: every GET of a repo
+    # (objects, lists, labels, whatever params they were cached with) and searches scoped to it, or the org
+    if match := _repo_path_regex.match(request_path):
+        return match.group(1)
+    if request_path == "/search/issues":
+        match = _search_repo_regex.search(str((params or {}).get("q", "")))
+        return match.group(1) if match else "org"
+    return None
+
+
+def _decode(status: int, headers: Mapping[str, str], text: str) -> _ApiResponse:
+    # error pages of proxies in front of the API (502, 503) are html, not json
+    if not text:
+        return status < 400, {}
+    if "json" not in headers.get("Content-Type", ""):
+        logger.warning(f"[GitHub] non-json response {status} ({headers.get('Content-Type')}): {text[:200]!r}")
+        return False, f"{status}: {text[:200]}"
+    try:
+        return status < 400, json.loads(text)
+    except ValueError as error:
+        logger.warning(f"[GitHub] malformed json response {status}: {error!r}")
+        return False, f"{status}: {text[:200]}"
+
+
+def endpoint_template(request_path: str) -> str:
+    endpoint = request_path.split("?")[0]
+    for pattern, replacement in _endpoint_patterns:
+        endpoint = pattern.sub(replacement, endpoint)
+    return endpoint
 
 
 def body_wrap(body: str, context: Context) -> str:
@@ -60,16 +122,72 @@ def comment_wrap_contextless(body: str, message) -> str:
            f"Follow the conversation [here]({message.jump_url})"
 
 
+async def _send_request(session: ClientSession, method: str, url: str, headers: dict,
+                        body: Optional[dict] = None, params: Optional[dict] = None) -> Tuple[int, Mapping, str]:
+    async with session.request(method, url, json=body, params=params, headers=headers) as response:
+        return response.status, response.headers.copy(), await response.text()
+
+
 async def github_api_request(session: ClientSession, request_kind: ApiRequestKind, request_path: str,
-                             body: Optional[dict] = None) -> _ApiResponse:
+                             body: Optional[dict] = None, params: Optional[dict] = None) -> _ApiResponse:
     completed_request_path = base_api_link + request_path
-    response = await getattr(session, str(request_kind))(completed_request_path, json=body, headers=base_api_headers)
-    return response.status < 400, await response.json()
+    method = str(request_kind)
+    endpoint = endpoint_template(request_path)
+    key = cache_key(auth_string, completed_request_path, params)
+
+    entry = None
+    if request_kind == ApiRequestKind.GET:
+        entry = await cache.get(key)
+        if entry and cache.is_fresh(entry):
+            cache.record("hit")
+            return True, json.loads(entry["body"])
+
+    headers = {**base_api_headers, **cache.conditional_headers(entry)}
+    resource = resource_of(request_path)
+    for attempt in range(_MAX_ATTEMPTS):
+        async with scheduler.slot(resource):
+            try:
+                with _request_seconds.time(method=method, endpoint=endpoint):
+                    status, response_headers, text = await _send_request(
+                        session, method, completed_request_path, headers, body, params
+                    )
+            except (ClientError, asyncio.TimeoutError) as error:
+                _requests_total.inc(method=method, endpoint=endpoint, status="error")
+                logger.warning(f"[GitHub] {method} {request_path} failed: {error!r}")
+                return False, repr(error)
+            retry_delay = scheduler.observe(resource, status, response_headers, text)
+        _requests_total.inc(method=method, endpoint=endpoint, status=status)
+        # requests rejected by rate limit had no effect, so even mutations are safe to repeat
+        if retry_delay is None or attempt == _MAX_ATTEMPTS - 1 or retry_delay > MAX_RETRY_WAIT[current_priority()]:
+            break
+        await asyncio.sleep(retry_delay)
+
+    if request_kind != ApiRequestKind.GET:
+        # resources of a repo read right after it was changed shouldn't be served from cache until max-age runs
+        # out, neither should searches they may appear in. graphql POSTs are reads and change nothing
+        if match := _repo_path_regex.match(request_path):
+            await asyncio.gather(cache.invalidate_scope(match.group(1)), cache.invalidate_scope("org"))
+        if match := _object_path_regex.match(request_path):
+            for kind in ("issues", "pulls"):
+                objects.drop(match.group(1), match.group(2), kind)
+        return _decode(status, response_headers, text)
+
+    if status == 304 and entry:
+        cache.record("not_modified")
+        entry["expires_at"] = time.time() + max_age(response_headers)
+        await cache.put(key, entry, cache_scope(request_path, params))
+        return True, json.loads(entry["body"])
+
+    cache.record("miss")
+    result = _decode(status, response_headers, text)
+    if result[0] and (new_entry := cache.make_entry(response_headers, text)):
+        await cache.put(key, new_entry, cache_scope(request_path, params))
+    return result
 
 
 async def open_issue(context: Context, repo: str, title: str, body: Optional[str] = "") -> _ApiResponse:
     return await github_api_request(
-        context.bot.session, ApiRequestKind.POST, f"/repos/arcadia-redux/{repo}/issues", {
+        transport.github, ApiRequestKind.POST, f"/repos/arcadia-redux/{repo}/issues", {
             "title": title,
             "body": body_wrap(body, context),
         }
@@ -86,7 +204,7 @@ async def close_issue(session: ClientSession, repo: str, issue_id: _Numeric) ->
 
 async def update_issue(context: Context, repo: str, title: str, body: str, issue_id: _Numeric) -> _ApiResponse:
     return await github_api_request(
-        context.bot.session, ApiRequestKind.PATCH, f"/repos/arcadia-redux/{repo}/issues/{issue_id}", {
+        transport.github, ApiRequestKind.PATCH, f"/repos/arcadia-redux/{repo}/issues/{issue_id}", {
             "title": title,
             "body": body_wrap(body, context),
         }
@@ -101,6 +219,15 @@ async def add_labels(session: ClientSession, repo: str, issue_id: _Numeric, labe
     )
 
 
+async def append_labels(session: ClientSession, repo: str, issue_id: _Numeric, labels: List[str]) -> _ApiResponse:
+    # unlike `add_labels`, keeps labels issue already has
+    return await github_api_request(
+        session, ApiRequestKind.POST, f"/repos/arcadia-redux/{repo}/issues/{issue_id}/labels", {
+            "labels": labels
+        }
+    )
+
+
 async def assign_issue(session: ClientSession, repo: str, issue_id: _Numeric, assignees: List[str]) -> _ApiResponse:
     return await github_api_request(
         session, ApiRequestKind.POST, f"/repos/arcadia-redux/{repo}/issues/{issue_id}/assignees", {
@@ -109,49 +236,115 @@ async def assign_issue(session: ClientSession, repo: str, issue_id: _Numeric, as
     )
 
 
-async def get_repos(bot) -> str:
-    global repositories
-    resp = await bot.session.get(f"{base_api_link}/orgs/arcadia-redux/repos", headers=base_api_headers)
-    if resp.status >= 400:
-        logger.warning(f"Error when fetching org repos: {await resp.body()}")
-        return ""
-    response = await resp.json()
-    repositories.clear()
-    for repo in response:
-        if repo["name"] not in excluded_global_repos:
-            preset_name = f' [{preset_repos_reverse[repo["name"]]}]' if repo["name"] in preset_repos_reverse else ""
-            repositories.append(f'`{repo["name"]}{preset_name}`')
-    repositories.sort()
-    return '\n'.join(repositories)
-
-
-async def get_issues_list(session: ClientSession, repo: str, state: str, count: _Numeric, page: _Numeric) -> str:
-    resp = await session.get(
-        f"{base_api_link}/repos/arcadia-redux/{repo}/issues?per_page={count}&state={state}&page={page}",
-        headers=base_api_headers
-    )
-    if resp.status >= 400:
-        return ""
-    response = await resp.json()
-    description_list = []
-    for issue in response:
-        issue_state = "🟢" if issue['state'] == "open" else "🔴"
-        description_list.append(
-            f"{issue_state} [`#{issue['number']}`]({issue['html_url']}) {issue['title']}"
+async def get_all_pages(session: ClientSession, request_path: str, params: Optional[dict] = None) -> _ApiResponse:
+    # every page of a list endpoint, unchanged pages are revalidated by ETag
+    items = []
+    page = 1
+    while True:
+        status, response = await github_api_request(
+            session, ApiRequestKind.GET, request_path, params={
+                **(params or {}),
+                "per_page": _LIST_PAGE_SIZE,
+                "page": page,
+            }
         )
-    return "\n".join(description_list)
+        if not status:
+            return status, response
+        items.extend(response)
+        if len(response) < _LIST_PAGE_SIZE:
+            return True, items
+        page += 1
 
 
-async def get_issue_by_number(session: ClientSession, repo: str, issue_id: _Numeric) -> _ApiResponse:
-    return await github_api_request(
-        session, ApiRequestKind.GET, f"/repos/arcadia-redux/{repo}/issues/{issue_id}"
+async def get_repos(session: ClientSession) -> _ApiResponse:
+    return await get_all_pages(session, "/orgs/arcadia-redux/repos")
+
+
+async def get_issues_list(session: ClientSession, repo: str, state: str, count: _Numeric,
+                          page: _Numeric) -> Optional[str]:
+    status, response = await github_api_request(
+        session, ApiRequestKind.GET, f"/repos/arcadia-redux/{repo}/issues", params={
+            "per_page": count,
+            "state": state,
+            "page": page,
+        }
     )
+    if not status:
+        return None
+    return "\n".join(format_issue_line(issue) for issue in response)
+
+
+def format_issue_line(issue: dict) -> str:
+    issue_state = "🟢" if issue['state'] == "open" else "🔴"
+    return f"{issue_state} [`#{issue['number']}`]({issue['html_url']}) {issue['title']}"
+
+
+async def _get_object(session: ClientSession, repo: str, number: _Numeric, kind: str) -> _ApiResponse:
+    if record := objects.get(repo, number, kind):
+        return True, record
+    status, response = await github_api_request(
+        session, ApiRequestKind.GET, f"/repos/arcadia-redux/{repo}/{kind}/{number}"
+    )
+    if status:
+        objects.put(repo, number, kind, response)
+    return status, response
+
+
+async def get_issue_by_number(session: ClientSession, repo: str, issue_id: _Numeric) -> _ApiResponse:
+    return await _get_object(session, repo, issue_id, "issues")
 
 
 async def get_pull_request_by_number(session: ClientSession, repo: str, pull_id: _Numeric) -> _ApiResponse:
-    return await github_api_request(
-        session, ApiRequestKind.GET, f"/repos/arcadia-redux/{repo}/pulls/{pull_id}"
+    return await _get_object(session, repo, pull_id, "pulls")
+
+
+async def get_issues_or_pulls(session: ClientSession,
+                              references: Iterable[Tuple[str, int]]) -> Dict[Tuple[str, int], dict]:
+    # resolves many (repo, number) pairs through aliased GraphQL fields, a few requests instead of one per reference
+    resolved = {}
+    by_repo: Dict[str, Set[int]] = {}
+    for repo, number in references:
+        if cached := objects.reference(repo, number):
+            resolved[(repo, int(number))] = cached
+            continue
+        by_repo.setdefault(repo, set()).add(int(number))
+    pairs = [(repo, number) for repo, numbers in by_repo.items() for number in sorted(numbers)]
+    step = _GRAPHQL_REFERENCES_PER_QUERY
+    chunks = [pairs[i:i + step] for i in range(0, len(pairs), step)]
+    for result in await asyncio.gather(*[_query_issues_or_pulls(session, chunk) for chunk in chunks]):
+        resolved.update(result)
+    return resolved
+
+
+async def _query_issues_or_pulls(session: ClientSession, pairs: List[Tuple[str, int]]) -> Dict[Tuple[str, int], dict]:
+    repos: Dict[str, List[int]] = {}
+    for repo, number in pairs:
+        repos.setdefault(repo, []).append(number)
+    fields = "title state url number"
+    repo_queries = []
+    for repo_index, (repo, numbers) in enumerate(repos.items()):
+        fields_by_number = " ".join(
+            f"i{number}: issueOrPullRequest(number: {number}) {{ ... on Issue {{ {fields} }} "
+            f"... on PullRequest {{ {fields} }} }}" for number in numbers
+        )
+        repo_queries.append(
+            f"r{repo_index}: repository(owner: \"arcadia-redux\", name: {json.dumps(repo)}) {{ {fields_by_number} }}"
+        )
+    status, response = await github_api_request(
+        session, ApiRequestKind.POST, "/graphql", {"query": f"query {{ {' '.join(repo_queries)} }}"}
     )
+    # missing objects come back as errors alongside partial data
+    data = response.get("data") if isinstance(response, dict) else None
+    if not status or not data:
+        logger.warning(f"GraphQL lookup of {len(pairs)} references failed: {response}")
+        return {}
+    resolved = {}
+    for repo_index, (repo, numbers) in enumerate(repos.items()):
+        repo_data = data.get(f"r{repo_index}") or {}
+        for number in numbers:
+            if obj := repo_data.get(f"i{number}"):
+                resolved[(repo, number)] = obj
+    return resolved
 
 
 async def get_commit_by_sha(session: ClientSession, repo: str, sha: str) -> _ApiResponse:
@@ -167,15 +360,11 @@ async def get_commits_diff(session: ClientSession, repo: str, base: str, head: s
 
 
 async def get_repo_labels(session: ClientSession, repo: str) -> _ApiResponse:
-    return await github_api_request(
-        session, ApiRequestKind.GET, f"/repos/arcadia-redux/{repo}/labels"
-    )
+    return await get_all_pages(session, f"/repos/arcadia-redux/{repo}/labels")
 
 
 async def get_arcadia_team_members(session: ClientSession) -> _ApiResponse:
-    return await github_api_request(
-        session, ApiRequestKind.GET, f"/organizations/46830822/team/4574724/members"
-    )
+    return await get_all_pages(session, f"/organizations/46830822/team/4574724/members")
 
 
 async def get_repo_single_label(session: ClientSession, repo: str, label_name: str) -> _ApiResponse:
@@ -195,31 +384,17 @@ async def create_repo_label(session: ClientSession, repo: str, label_name: str,
     )
 
 
-async def set_issue_milestone(session: ClientSession, repo: str, issue_id: _Numeric, milestone: str) -> _ApiResponse:
-    status, repo_milestones = await get_repo_milestones(session, repo)
-    if not status:
-        return status, repo_milestones
-    milestone_dict = next(
-        (item for item in repo_milestones if item["title"].lower().strip() == milestone.lower().strip()), None
-    )
-    if not milestone_dict:
-        return False, {"error": f"No milestone with name `{milestone}`"}
-    milestone_number = milestone_dict.get("number", None)
-    if not milestone_number:
-        return False, {"error": f"No milestone with name `{milestone}`"}
-    issue_body = {
-        "milestone": milestone_number
-    }
-    resp = await session.patch(
-        f"{base_api_link}/repos/arcadia-redux/{repo}/issues/{issue_id}", json=issue_body, headers=base_api_headers,
+async def set_issue_milestone(session: ClientSession, repo: str, issue_id: _Numeric,
+                              milestone_number: int) -> _ApiResponse:
+    return await github_api_request(
+        session, ApiRequestKind.PATCH, f"/repos/arcadia-redux/{repo}/issues/{issue_id}", {
+            "milestone": milestone_number
+        }
     )
-    return resp.status < 400, await resp.json()
 
 
 async def get_repo_milestones(session: ClientSession, repo: str) -> _ApiResponse:
-    return await github_api_request(
-        session, ApiRequestKind.GET, f"/repos/arcadia-redux/{repo}/milestones"
-    )
+    return await get_all_pages(session, f"/repos/arcadia-redux/{repo}/milestones")
 
 
 async def comment_issue(session: ClientSession, repo: str, issue_id: _Numeric, body: str) -> _ApiResponse:
@@ -230,15 +405,33 @@ async def comment_issue(session: ClientSession, repo: str, issue_id: _Numeric, b
     )
 
 
+async def search_org_issues(session: ClientSession, query: str, limit: Optional[int] = None) -> _ApiResponse:
+    # walks through pages until `limit` items are collected, search API returns at most 1000 results for a query
+    items = []
+    page = 1
+    while True:
+        status, response = await github_api_request(
+            session, ApiRequestKind.GET, "/search/issues", params={
+                "q": f"org:arcadia-redux {query}",
+                "per_page": _SEARCH_PAGE_SIZE,
+                "page": page,
+            }
+        )
+        if not status:
+            return status, response
+        items.extend(response["items"])
+        total = min(response["total_count"], _SEARCH_MAX_RESULTS, limit or _SEARCH_MAX_RESULTS)
+        if len(response["items"]) < _SEARCH_PAGE_SIZE or len(items) >= total:
+            return True, items[:limit]
+        page += 1
+
+
 async def search_issues(session: ClientSession, repo: str, query: str,
                         page_num: Optional[_Numeric] = 1, per_page: Optional[_Numeric] = 10) -> _ApiResponse:
-    request_body = {
-        "q": f"repo:arcadia-redux/{repo} {query}",
-        "per_page": per_page,
-        "page": page_num
-    }
-
-    resp = await session.get(
-        f"{base_api_link}/search/issues", headers=base_api_headers, params=request_body
+    return await github_api_request(
+        session, ApiRequestKind.GET, "/search/issues", params={
+            "q": f"repo:arcadia-redux/{repo} {query}",
+            "per_page": per_page,
+            "page": page_num
+        }
     )
-    return resp.status < 400, await resp.json()
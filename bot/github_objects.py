@@ -0,0 +1,105 @@
+import asyncio
+import json
+import os
+from typing import Callable, Final, List, Optional, Tuple
+
+from cachetools import TTLCache
+from loguru import logger
+from arcadia_common import metrics
+
+# published by webhook listener on `issues`, `issue_comment` and `pull_request` events
+EVENTS_CHANNEL: Final = "github:objects"
+KINDS: Final = ("issues", "pulls")
+
+_lookups_total = metrics.counter("github_object_lookups_total", "Issue and PR record lookups by result", ["result"])
+_updates_total = metrics.counter("github_object_updates_total", "Issue and PR records updated by webhook events")
+_stale_events_total = metrics.counter("github_object_stale_events_total", "Webhook events older than cached record")
+
+_Key = Tuple[str, int, str]
+
+
+# Issue and pull request records (as returned by REST API) keyed by (repo, number, kind). Webhook events keep
+# popular records current, so unfurling them needs no API calls; TTL covers events that never arrived
+class GithubObjectCache:
+    def __init__(self, ttl: float, size: int = 2000):
+        self.records = TTLCache(maxsize=size, ttl=ttl)
+        self.task: Optional[asyncio.Task] = None
+        # called with every applied event, for other views of issues (like search index) to follow
+        self.listeners: List[Callable[[dict], None]] = []
+
+        self.hits = 0
+        self.misses = 0
+        self.updates = 0
+
+    @staticmethod
+    def _key(repo: str, number, kind: str) -> _Key:
+        return repo, int(number), kind
+
+    # callers get a shallow copy, as embed builders rewrite fields like `body` in place
+    def get(self, repo: str, number, kind: str) -> Optional[dict]:
+        record = self.records.get(self._key(repo, number, kind))
+        if record is None:
+            self.misses += 1
+            _lookups_total.inc(result="miss")
+            return None
+        self.hits += 1
+        _lookups_total.inc(result="hit")
+        return dict(record)
+
+    def put(self, repo: str, number, kind: str, record: dict):
+        self.records[self._key(repo, number, kind)] = dict(record)
+
+    def drop(self, repo: str, number, kind: str):
+        self.records.pop(self._key(repo, number, kind), None)
+
+    # title, state and link of issue or PR, whichever is cached
+    def reference(self, repo: str, number) -> Optional[dict]:
+        for kind in KINDS:
+            record = self.records.get(self._key(repo, number, kind))
+            if record:
+                return {"title": record["title"], "state": record["state"], "url": record["html_url"],
+                        "number": record["number"]}
+        return None
+
+    async def start(self, redis):
+        channel, = await redis.subscribe(EVENTS_CHANNEL)
+        self.task = asyncio.ensure_future(self._listen(channel))
+
+    @logger.catch
+    async def _listen(self, channel):
+        async for raw in channel.iter(encoding="utf-8"):
+            try:
+                event = json.loads(raw)
+                if not self.apply(event):
+                    continue
+            except (ValueError, KeyError, TypeError):
+                logger.warning(f"[GitHub] malformed object event: {raw!r}")
+                continue
+            for listener in self.listeners:
+                listener(event)
+
+    # False if event is older than cached record - webhook deliveries may arrive out of order
+    def apply(self, event: dict) -> bool:
+        repo, number, kind = event["repo"], event["number"], event["kind"]
+        record, cached = event.get("record"), self.records.get(self._key(repo, number, kind))
+        if record and cached and (record.get("updated_at") or "") < (cached.get("updated_at") or ""):
+            _stale_events_total.inc()
+            return False
+        # issue view of a PR and PR itself share title, state and labels, the other one is refetched when needed
+        for other_kind in KINDS:
+            if other_kind != kind:
+                self.drop(repo, number, other_kind)
+        if record:
+            self.put(repo, number, kind, record)
+        else:
+            self.drop(repo, number, kind)
+        self.updates += 1
+        _updates_total.inc()
+        return True
+
+    def stats_text(self) -> str:
+        return f"GitHub objects: {len(self.records)} cached, {self.hits} hits, {self.misses} misses, " \
+               f"{self.updates} webhook updates"
+
+
+objects = GithubObjectCache(float(os.getenv("GITHUB_OBJECT_TTL", 300)))
@@ -0,0 +1,208 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Dict, Final, List, Mapping, Optional, Tuple
+
+from loguru import logger
+from arcadia_common import metrics
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0  # commands and replies typed by people
+    UNFURL = 1  # embeds for pasted links
+    BULK = 2  # mass operations started by people, allowed to take a while
+    BACKGROUND = 3  # periodic scans
+
+
+# share of the budget each lane leaves untouched for lanes above it
+_RESERVE: Final = {
+    Priority.INTERACTIVE: 0.0,
+    Priority.UNFURL: 0.02,
+    Priority.BULK: 0.1,
+    Priority.BACKGROUND: 0.2,
+}
+# longest wait after being rate limited before giving up on retrying a request
+MAX_RETRY_WAIT: Final = {
+    Priority.INTERACTIVE: 10,
+    Priority.UNFURL: 30,
+    Priority.BULK: 300,
+    Priority.BACKGROUND: 900,
+}
+_SECONDARY_BACKOFF_BASE: Final = 2.0
+_SECONDARY_BACKOFF_MAX: Final = 120.0
+
+_current_priority: ContextVar[Priority] = ContextVar("github_priority", default=Priority.INTERACTIVE)
+
+_remaining_gauge = metrics.gauge("github_rate_limit_remaining", "Remaining GitHub API budget", ["resource"])
+_limit_gauge = metrics.gauge("github_rate_limit_limit", "GitHub API budget per window", ["resource"])
+_rate_limited_total = metrics.counter("github_rate_limited_total", "Responses rejected by GitHub rate limits",
+                                      ["resource"])
+_wait_seconds = metrics.histogram("github_scheduler_wait_seconds", "Time requests waited for a slot", ["priority"])
+
+
+@contextmanager
+def github_priority(priority: Priority):
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def current_priority() -> Priority:
+    return _current_priority.get()
+
+
+def resource_of(request_path: str) -> str:
+    if request_path.startswith("/search"):
+        return "search"
+    if request_path.startswith("/graphql"):
+        return "graphql"
+    return "core"
+
+
+class RateBudget:
+    def __init__(self):
+        self.limit = 0
+        self.remaining = 0
+        self.reset_at = 0.0  # unix time
+        self.in_flight = 0
+
+    def update(self, headers: Mapping[str, str]):
+        if "X-RateLimit-Remaining" not in headers:
+            return
+        self.limit = int(headers.get("X-RateLimit-Limit", self.limit))
+        self.remaining = int(headers["X-RateLimit-Remaining"])
+        self.reset_at = float(headers.get("X-RateLimit-Reset", self.reset_at))
+
+    def delay_for(self, priority: Priority) -> float:
+        if not self.limit or self.reset_at <= time.time():
+            return 0.0
+        if self.remaining - self.in_flight > self.limit * _RESERVE[priority]:
+            return 0.0
+        return self.reset_at - time.time() + 1
+
+
+_Waiter = Tuple[Priority, int, str, asyncio.Future]
+
+
+# Hands out request slots in priority order, keeping track of primary and search budgets reported by GitHub.
+# Lower lanes stop before budget runs out, leaving the rest to interactive requests; when GitHub rejects a request
+# with 403/429 the whole resource is paused until reset or `Retry-After`, with jittered backoff for secondary limits
+class GithubScheduler:
+    def __init__(self, concurrency: int = 8):
+        self.concurrency = concurrency
+        self.active = 0
+        self.budgets: Dict[str, RateBudget] = {}
+        self.blocked_until: Dict[str, float] = {}  # monotonic time
+        self.waiting: List[_Waiter] = []
+        self._sequence = itertools.count()
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+        self._consecutive_limits: Dict[str, int] = {}
+
+    def budget(self, resource: str) -> RateBudget:
+        if resource not in self.budgets:
+            self.budgets[resource] = RateBudget()
+        return self.budgets[resource]
+
+    @asynccontextmanager
+    async def slot(self, resource: str):
+        priority = current_priority()
+        started_at = time.monotonic()
+        future = asyncio.get_event_loop().create_future()
+        heapq.heappush(self.waiting, (priority, next(self._sequence), resource, future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release(resource)
+            raise
+        _wait_seconds.observe(time.monotonic() - started_at, priority=priority.name.lower())
+        try:
+            yield
+        finally:
+            self._release(resource)
+
+    def _release(self, resource: str):
+        self.active -= 1
+        self.budget(resource).in_flight -= 1
+        self._dispatch()
+
+    def _delay(self, resource: str, priority: Priority) -> float:
+        blocked = self.blocked_until.get(resource, 0) - time.monotonic()
+        if blocked > 0:
+            return blocked
+        return self.budget(resource).delay_for(priority)
+
+    def _dispatch(self):
+        deferred = []
+        next_check = None
+        while self.waiting and self.active < self.concurrency:
+            waiter = heapq.heappop(self.waiting)
+            priority, _, resource, future = waiter
+            if future.done():
+                continue
+            delay = self._delay(resource, priority)
+            if delay > 0:
+                deferred.append(waiter)
+                next_check = delay if next_check is None else min(next_check, delay)
+                continue
+            self.active += 1
+            self.budget(resource).in_flight += 1
+            future.set_result(None)
+        for waiter in deferred:
+            heapq.heappush(self.waiting, waiter)
+
+        if next_check is not None:
+            if self._wakeup:
+                self._wakeup.cancel()
+            self._wakeup = asyncio.get_event_loop().call_later(next_check, self._dispatch)
+
+    # returns seconds to wait before retrying, if request was rejected by rate limit
+    def observe(self, resource: str, status: int, headers: Mapping[str, str], text: str = "") -> Optional[float]:
+        resource = headers.get("X-RateLimit-Resource", resource)
+        budget = self.budget(resource)
+        budget.update(headers)
+        if budget.limit:
+            _remaining_gauge.set(budget.remaining, resource=resource)
+            _limit_gauge.set(budget.limit, resource=resource)
+
+        if status not in (403, 429):
+            self._consecutive_limits.pop(resource, None)
+            return None
+        if "Retry-After" in headers:
+            delay = float(headers["Retry-After"])
+        elif headers.get("X-RateLimit-Remaining") == "0":
+            delay = max(0.0, budget.reset_at - time.time()) + 1
+        elif status == 429 or "rate limit" in text.lower():
+            attempt = self._consecutive_limits.get(resource, 0)
+            delay = min(_SECONDARY_BACKOFF_MAX, _SECONDARY_BACKOFF_BASE * 2 ** attempt)
+        else:
+            # plain 403, like missing permissions
+            return None
+
+        self._consecutive_limits[resource] = self._consecutive_limits.get(resource, 0) + 1
+        delay *= random.uniform(1.0, 1.25)
+        _rate_limited_total.inc(resource=resource)
+        logger.warning(f"[GitHub] rate limited on {resource}, pausing for {delay:.1f}s")
+        self.blocked_until[resource] = max(self.blocked_until.get(resource, 0), time.monotonic() + delay)
+        return delay
+
+    def stats_text(self) -> str:
+        lines = []
+        for resource, budget in sorted(self.budgets.items()):
+            if not budget.limit:
+                continue
+            reset_in = max(0, int(budget.reset_at - time.time()))
+            lines.append(f"GitHub {resource}: {budget.remaining}/{budget.limit} left, resets in {reset_in}s")
+        lines.append(f"GitHub scheduler: {self.active} active, {len(self.waiting)} waiting")
+        return "\n".join(lines)
+
+
+scheduler = GithubScheduler()
@@ -0,0 +1,262 @@
+import asyncio
+import os
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Final, Iterable, List, Optional, Set, Tuple
+
+from aiohttp import ClientSession
+from loguru import logger
+from arcadia_common import metrics
+
+from .github_integration import get_all_pages
+from .github_objects import objects
+
+_searches_total = metrics.counter("issue_index_searches_total", "Issue searches by where they were answered",
+                                  ["source"])
+_search_seconds = metrics.histogram("issue_index_search_seconds", "Local issue search latency")
+
+_SCHEMA: Final = """
+CREATE TABLE IF NOT EXISTS issues (
+    id INTEGER PRIMARY KEY,
+    repo TEXT NOT NULL COLLATE NOCASE,
+    number INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    body TEXT NOT NULL,
+    state TEXT NOT NULL,
+    is_pull INTEGER NOT NULL,
+    milestone TEXT,
+    html_url TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    UNIQUE (repo, number)
+);
+CREATE INDEX IF NOT EXISTS issues_updated ON issues (repo, updated_at);
+CREATE TABLE IF NOT EXISTS issue_labels (
+    issue_id INTEGER NOT NULL REFERENCES issues (id) ON DELETE CASCADE,
+    name TEXT NOT NULL COLLATE NOCASE
+);
+CREATE INDEX IF NOT EXISTS issue_labels_issue ON issue_labels (issue_id);
+CREATE TABLE IF NOT EXISTS issue_assignees (
+    issue_id INTEGER NOT NULL REFERENCES issues (id) ON DELETE CASCADE,
+    login TEXT NOT NULL COLLATE NOCASE
+);
+CREATE INDEX IF NOT EXISTS issue_assignees_issue ON issue_assignees (issue_id);
+CREATE TABLE IF NOT EXISTS sync_state (
+    repo TEXT PRIMARY KEY COLLATE NOCASE,
+    synced_until TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS issues_fts USING fts5(
+    title, body, content='issues', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS issues_ai AFTER INSERT ON issues BEGIN
+    INSERT INTO issues_fts (rowid, title, body) VALUES (new.id, new.title, new.body);
+END;
+CREATE TRIGGER IF NOT EXISTS issues_ad AFTER DELETE ON issues BEGIN
+    INSERT INTO issues_fts (issues_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+END;
+CREATE TRIGGER IF NOT EXISTS issues_au AFTER UPDATE ON issues BEGIN
+    INSERT INTO issues_fts (issues_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+    INSERT INTO issues_fts (rowid, title, body) VALUES (new.id, new.title, new.body);
+END;
+"""
+
+_UPSERT: Final = """
+INSERT INTO issues (repo, number, title, body, state, is_pull, milestone, html_url, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (repo, number) DO UPDATE SET
+    title = excluded.title, body = excluded.body, state = excluded.state, is_pull = excluded.is_pull,
+    milestone = excluded.milestone, html_url = excluded.html_url, updated_at = excluded.updated_at
+WHERE excluded.updated_at >= issues.updated_at
+"""
+
+_token_regex = re.compile(r'(?:(?P<qualifier>[a-z]+):)?(?P<value>"[^"]*"|\S+)')
+
+
+class SearchQuery:
+    def __init__(self):
+        self.text: List[str] = []
+        self.conditions: List[str] = []
+        self.params: List = []
+
+
+# Parses qualifiers the index understands (`is:`, `state:`, `label:`, `assignee:`, `milestone:`, `no:`) and
+# free text. Returns None for anything else, like negations, OR, sorting or date ranges, leaving it to GitHub
+def parse_query(query: str) -> Optional[SearchQuery]:
+    parsed = SearchQuery()
+    for match in _token_regex.finditer(query.strip()):
+        qualifier, value = match.group("qualifier"), match.group("value").strip('"')
+        if qualifier is None:
+            if value.startswith("-") or value in ("OR", "AND", "NOT"):
+                return None
+            parsed.text.append(value)
+        elif qualifier in ("is", "state") and value.lower() in ("open", "closed"):
+            parsed.conditions.append("i.state = ?")
+            parsed.params.append(value.lower())
+        elif qualifier in ("is", "type") and value.lower() in ("issue", "pr"):
+            parsed.conditions.append("i.is_pull = ?")
+            parsed.params.append(int(value.lower() == "pr"))
+        elif qualifier == "label":
+            parsed.conditions.append("EXISTS (SELECT 1 FROM issue_labels l WHERE l.issue_id = i.id AND l.name = ?)")
+            parsed.params.append(value)
+        elif qualifier == "assignee":
+            parsed.conditions.append(
+                "EXISTS (SELECT 1 FROM issue_assignees a WHERE a.issue_id = i.id AND a.login = ?)"
+            )
+            parsed.params.append(value)
+        elif qualifier == "milestone":
+            parsed.conditions.append("i.milestone = ? COLLATE NOCASE")
+            parsed.params.append(value)
+        elif qualifier == "no" and value in ("label", "assignee", "milestone"):
+            parsed.conditions.append({
+                "label": "NOT EXISTS (SELECT 1 FROM issue_labels l WHERE l.issue_id = i.id)",
+                "assignee": "NOT EXISTS (SELECT 1 FROM issue_assignees a WHERE a.issue_id = i.id)",
+                "milestone": "i.milestone IS NULL",
+            }[value])
+        else:
+            return None
+    return parsed
+
+
+def _row_of(repo: str, record: dict, is_pull: bool) -> Tuple:
+    milestone = record.get("milestone")
+    return (
+        repo, record["number"], record["title"], record.get("body") or "", record["state"], int(is_pull),
+        milestone["title"] if milestone else None, record["html_url"], record["updated_at"],
+    )
+
+
+# Local mirror of issues and pull requests of org repositories in SQLite with FTS5, bootstrapped by paginated
+# listing and kept current by webhook events, so searches cost neither time nor search API quota.
+# All database work runs on a single dedicated thread, which also owns the connection
+class IssueIndex:
+    def __init__(self, path: str):
+        self.path = path
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="issue-index")
+        self.db: Optional[sqlite3.Connection] = None
+        self.synced: Set[str] = set()  # lowercase names of repos fully mirrored at least once
+
+        self.local_searches = 0
+        self.fallbacks = 0
+
+    async def _run(self, function, *args):
+        return await asyncio.get_event_loop().run_in_executor(self.executor, function, *args)
+
+    def _open(self) -> List[str]:
+        self.db = sqlite3.connect(self.path)
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.execute("PRAGMA foreign_keys = ON")
+        self.db.executescript(_SCHEMA)
+        return [repo for repo, in self.db.execute("SELECT repo FROM sync_state")]
+
+    async def start(self):
+        self.synced = {repo.lower() for repo in await self._run(self._open)}
+        objects.listeners.append(self.apply)
+        logger.info(f"[IssueIndex] opened {self.path}, {len(self.synced)} repos mirrored")
+
+    def _store(self, repo: str, records: Iterable[Tuple[dict, bool]], synced_until: Optional[str] = None):
+        with self.db:
+            for record, is_pull in records:
+                self.db.execute(_UPSERT, _row_of(repo, record, is_pull))
+                issue_id, updated_at = self.db.execute(
+                    "SELECT id, updated_at FROM issues WHERE repo = ? AND number = ?", (repo, record["number"])
+                ).fetchone()
+                if updated_at != record["updated_at"]:
+                    continue  # stored copy is newer
+                self.db.execute("DELETE FROM issue_labels WHERE issue_id = ?", (issue_id,))
+                self.db.execute("DELETE FROM issue_assignees WHERE issue_id = ?", (issue_id,))
+                self.db.executemany("INSERT INTO issue_labels (issue_id, name) VALUES (?, ?)",
+                                    [(issue_id, label["name"]) for label in record.get("labels") or []])
+                self.db.executemany("INSERT INTO issue_assignees (issue_id, login) VALUES (?, ?)",
+                                    [(issue_id, user["login"]) for user in record.get("assignees") or []])
+            if synced_until:
+                self.db.execute("INSERT OR REPLACE INTO sync_state (repo, synced_until) VALUES (?, ?)",
+                                (repo, synced_until))
+
+    def _remove(self, repo: str, number: int):
+        with self.db:
+            self.db.execute("DELETE FROM issues WHERE repo = ? AND number = ?", (repo, number))
+
+    def _synced_until(self, repo: str) -> Optional[str]:
+        row = self.db.execute("SELECT synced_until FROM sync_state WHERE repo = ?", (repo,)).fetchone()
+        return row[0] if row else None
+
+    # webhook event relayed by object cache, submitted right away so that events are stored in arrival order
+    def apply(self, event: dict):
+        if self.db is None:
+            return
+        repo, number, record = event["repo"], event["number"], event.get("record")
+        if record:
+            is_pull = event["kind"] == "pulls" or "pull_request" in record
+            future = asyncio.get_event_loop().run_in_executor(self.executor, self._store, repo, [(record, is_pull)])
+        else:
+            future = asyncio.get_event_loop().run_in_executor(self.executor, self._remove, repo, number)
+        future.add_done_callback(self._log_failure)
+
+    @staticmethod
+    def _log_failure(future: asyncio.Future):
+        if not future.cancelled() and future.exception():
+            logger.error(f"[IssueIndex] failed to apply event: {future.exception()!r}")
+
+    # fetches issues updated since last sync, first sync of a repo lists all of them
+    async def sync_repo(self, session: ClientSession, repo: str) -> bool:
+        since = await self._run(self._synced_until, repo)
+        params = {"state": "all", "sort": "updated", "direction": "asc"}
+        if since:
+            params["since"] = since
+        status, issues = await get_all_pages(session, f"/repos/arcadia-redux/{repo}/issues", params)
+        if not status:
+            logger.warning(f"[IssueIndex] failed to sync {repo}: {issues}")
+            return False
+        synced_until = max((issue["updated_at"] for issue in issues), default=since) or "1970-01-01T00:00:00Z"
+        await self._run(self._store, repo, [(issue, "pull_request" in issue) for issue in issues], synced_until)
+        self.synced.add(repo.lower())
+        if issues:
+            logger.info(f"[IssueIndex] synced {len(issues)} issues of {repo}")
+        return True
+
+    async def sync(self, session: ClientSession, repos: Iterable[str]):
+        for repo in repos:
+            await self.sync_repo(session, repo)
+
+    def _search(self, repo: str, parsed: SearchQuery, page: int, per_page: int) -> dict:
+        tables = "issues i"
+        conditions = ["i.repo = ?", *parsed.conditions]
+        params = [repo, *parsed.params]
+        order = "i.updated_at DESC"
+        if parsed.text:
+            tables += " JOIN issues_fts ON issues_fts.rowid = i.id"
+            conditions.append("issues_fts MATCH ?")
+            params.append(" ".join('"{}"'.format(term.replace('"', '""')) for term in parsed.text))
+            order = "bm25(issues_fts), i.updated_at DESC"
+        where = " AND ".join(conditions)
+
+        total, = self.db.execute(f"SELECT COUNT(*) FROM {tables} WHERE {where}", params).fetchone()
+        rows = self.db.execute(
+            f"SELECT i.number, i.title, i.state, i.html_url FROM {tables} WHERE {where} ORDER BY {order} "
+            f"LIMIT ? OFFSET ?", [*params, per_page, (page - 1) * per_page]
+        ).fetchall()
+        return {
+            "total_count": total,
+            "items": [{"number": number, "title": title, "state": state, "html_url": html_url}
+                      for number, title, state, html_url in rows],
+        }
+
+    # result is shaped like GitHub search response, None if query or repo has to be left to GitHub
+    async def search(self, repo: str, query: str, page: int, per_page: int) -> Optional[dict]:
+        parsed = parse_query(query) if repo.lower() in self.synced else None
+        if parsed is None:
+            self.fallbacks += 1
+            _searches_total.inc(source="github")
+            return None
+        with _search_seconds.time():
+            result = await self._run(self._search, repo, parsed, page, per_page)
+        self.local_searches += 1
+        _searches_total.inc(source="local")
+        return result
+
+    def stats_text(self) -> str:
+        return f"Issue index: {len(self.synced)} repos, {self.local_searches} local searches, " \
+               f"{self.fallbacks} sent to GitHub"
+
+
+issue_index = IssueIndex(os.getenv("ISSUE_INDEX_PATH", "issue_index.sqlite3"))
@@ -0,0 +1,103 @@
+# Bundled data for local language pre-detection.
+# ENGLISH_TRIGRAMS are the 600 most frequent space-padded character trigrams of running english text, counted over
+# common open source licenses (Apache 2.0, Artistic, GFDL 1.3, GPL 2/3, LGPL 2.1, MPL 2.0, ~21k words). Register is
+# legal, but it is prose - unlike code documentation, it doesn't favour identifiers and keywords like `def` or `byte`.
+# Word lists are short vocabularies of common english (incl. game slang) and foreign stop words.
+from typing import Final, FrozenSet
+
+ENGLISH_TRIGRAMS: Final[FrozenSet[str]] = frozenset({
+    " th", "the", "he ", " co", "ion", "or ", " of", "of ", "ed ", "on ", " an", "tio",
+    " li", "se ", "er ", " in", "is ", "to ", " to", "lic", "ice", " or", " yo", "you",
+    " a ", "ent", "es ", "ens", "ing", "cen", "nse", "ng ", " pr", "and", "nd ", "ou ",
+    " fo", "for", " re", "ati", " no", "pro", "thi", "nt ", "at ", "ns ", "ver", "con",
+    "re ", "in ", "ons", "his", "tha", "hat", "but", " so", " ma", "not", "tri", "her",
+    "wor", " wo", "cop", "ork", "ate", "rib", "le ", " is", "ect", "ts ", "ibu", "ter",
+    "ce ", " wi", "al ", "ly ", "der", "any", "are", "ith", " di", "ny ", "cti", " pa",
+    "ers", "dis", "rk ", "opy", " it", "str", "ist", " fr", "our", "sio", "te ", "all",
+    "ry ", "ch ", "erm", "wit", " su", "gra", "it ", "war", "ve ", "rig", "use", " mo",
+    " wh", " be", " se", "ot ", "as ", " do", "ere", "ary", " us", " un", "nde", " on",
+    " te", "men", "und", "ble", "by ", "ght", " as", "ll ", "th ", "igh", "ont", " ex",
+    "de ", " by", "ant", "ty ", "ive", " if", "if ", "ran", "ove", " ve", "dif", "com",
+    "ted", " pu", "ay ", "ms ", "oth", "mod", " de", "ogr", "bli", "ram", "rog", " al",
+    "red", "odi", "rsi", "iti", "st ", "res", "bra", "ree", "lib", "an ", "rar", "ibr",
+    "par", "tic", "ies", "sec", "abl", "ica", "ubl", "ftw", "sof", "twa", "oft", "ee ",
+    "ifi", " ot", "ute", "may", "pub", "ge ", "per", "ct ", "ten", "ntr", "fre", " me",
+    "am ", "ess", "inc", "cov", "be ", "art", "orm", "ide", "tho", "ndi", " pe", "rec",
+    "sta", "en ", "ur ", "suc", "nte", "uch", "uti", " ap", "ht ", "ume", "om ", "rmi",
+    "rce", "cum", "rs ", "rms", "era", "pyr", "yri", "ond", "nti", "ic ", "app", "age",
+    "sed", "clu", "oti", "py ", " ar", "ans", "urc", "ut ", "rom", "sou", "int", " wa",
+    "dit", "me ", "ces", "doc", "ser", "ocu", "fro", "ode", "omp", "nts", "ose", "ded",
+    "ner", " st", " ge", " ha", "din", "les", "cod", "ain", " ca", "tin", "ina", " en",
+    "ied", " fi", " ac", "cat", "ire", "lud", "tat", "equ", "ene", "pli", "mit", " sh",
+    "eci", "gen", "ust", "pie", "ppl", "fer", "eri", "ity", "pre", "ncl", "ese", "eve",
+    "tor", "rov", "vid", "ovi", " ho", "cha", " ad", "tit", "arr", "mpl", " ne", " ch",
+    "ss ", "ne ", "mat", "rea", "mea", "ses", "ral", "ial", "tiv", "fie", "ine", "nce",
+    "han", "rm ", "tai", " ri", "rra", "rti", "eme", "uto", " mu", "tra", "nta", "fic",
+    " la", "ach", "ean", "ssi", "so ", "nda", "lit", "lat", "mus", "ria", "act", "nal",
+    "pat", "ext", "ffe", "add", "ins", "nge", "its", " le", "qui", "rat", " at", "ang",
+    "pos", "mak", "whe", "ece", "ify", "hol", "acc", "one", "fy ", "rt ", "rin", "lly",
+    " ob", "end", "hic", "mer", "ish", "ks ", "tab", "hts", "ile", "ili", "aut", "whi",
+    "lis", " tr", "ame", "ack", "pri", " au", "hou", "tan", "rks", "out", " sa", " gn",
+    "ich", "who", "ase", "ow ", " gr", "ega", "ind", "nu ", "edi", "ise", "hav", "exe",
+    "tte", "ke ", "cal", "ari", "imi", "lai", "itl", "yin", "ld ", "hen", "hes", "eas",
+    "gnu", "ake", "can", "cla", "nst", "exc", "spe", "rd ", "req", " ba", "ey ", "sub",
+    " ti", "uir", "ona", "nty", "opi", "ave", "min", "hor", "cor", "aim", "ned", "nat",
+    "tie", " bu", "nve", "pec", "no ", "ar ", "gat", "oun", "lin", "onv", "tle", "jec",
+    "how", "bje", "ude", "iss", "iva", "hin", "dat", "ill", "do ", "mis", " sp", "sse",
+    "vey", "fil", " we", "tex", "sha", "rma", "uth", "ple", "bil", " ea", "duc", "riv",
+    "lim", "old", "des", "pon", "esp", "odu", "low", "eed", "rre", "lar", "ace", " im",
+    "pla", "hal", "ept", "est", "cei", "ste", "cep", "ail", "em ", " po", "xec", "rpo",
+    "ven", "har", "ely", "rop", "rod", " da", " gi", "pac", "sin", "giv", "ite", "erc",
+    "ecu", "cut", "als", "por", "eac", "hos", "lie", "led", "bas", "ref", "ime", "ply",
+    "wis", " ab", "uld", " ag", "gin", "ard", "oul", "uta", "eiv", "ome", "udi", "rit",
+    "dar", "kin", "imp", "obj", "pt ", "ors", "nsi", "anc", "tem", "sho", "ori", "vat",
+    "oll", "omm", "ore", "lia", "lde", "ure", "rge", "man", "arg", "us ", "gre", " cl",
+    "ual", "inf", "eit", "ren", "spo", " fa", "cia", "tim", "oes", " fu", "itt", "doe",
+    " op", "wil", " ei", "att", "'s ", "ord", "cka", "llo", "ibl", "ian", "kag", "cce",
+    "cip", "ort", "ien", "rel", "reg", " si", "uct", "we ", "abi", "ges", "nen", "oss",
+    "ict", "ini", "she", "rem", " ev", "leg", "eth", "rac", "rep", "lle", "efe", "ved",
+})
+
+ENGLISH_WORDS: Final[FrozenSet[str]] = frozenset({
+    "a", "abilities", "ability", "about", "above", "add", "afk", "after", "again", "against", "aghanim", "aghs",
+    "all", "almost", "also", "always", "am", "an", "and", "any", "anymore", "anyone", "anything", "are", "aren't",
+    "armor", "around", "as", "at", "attack", "away", "back", "bad", "balance", "balanced", "bans", "be", "because",
+    "been", "before", "being", "better", "between", "big", "boring", "boss", "bot", "both", "bots", "broken",
+    "buff", "bug", "bugged", "bugs", "build", "but", "buy", "by", "can", "can't", "cannot", "cant", "cast", "chat",
+    "cheap", "cheater", "come", "cooldown", "cost", "could", "couldn't", "crash", "crashed", "creep", "creeps",
+    "crit", "damage", "day", "dead", "death", "dev", "devs", "did", "didn't", "didnt", "die", "dies", "disconnect",
+    "do", "does", "doesn't", "doesnt", "doing", "don't", "done", "dont", "down", "dps", "during", "each", "easy",
+    "either", "else", "end", "enemy", "enough", "even", "event", "ever", "every", "everyone", "everything",
+    "feedback", "few", "find", "first", "fix", "fixed", "for", "fortune", "free", "from", "full", "fun", "game",
+    "games", "get", "gets", "getting", "gg", "give", "glory", "go", "goes", "going", "gold", "gone", "good", "got",
+    "great", "hacker", "had", "hard", "has", "hasn't", "have", "haven't", "having", "he", "her", "here", "hero",
+    "heroes", "him", "his", "hit", "hits", "how", "hp", "i", "i'm", "if", "im", "imba", "in", "into", "is",
+    "isn't", "isnt", "it", "it's", "item", "items", "its", "ive", "just", "keep", "kill", "killed", "kills",
+    "kind", "know", "lag", "laggy", "lane", "last", "least", "leave", "leaver", "left", "less", "let", "level",
+    "like", "little", "lol", "long", "look", "lose", "lost", "lot", "lots", "luck", "make", "makes", "mana",
+    "many", "map", "match", "maybe", "me", "mmr", "mod", "mode", "money", "more", "most", "much", "must", "my",
+    "need", "needs", "nerf", "nerfed", "never", "new", "next", "no", "nobody", "noob", "not", "nothing", "now",
+    "of", "off", "often", "ok", "okay", "on", "once", "one", "only", "op", "or", "other", "our", "out", "over",
+    "own", "paid", "patch", "pay", "play", "played", "player", "players", "playing", "please", "pls", "plz",
+    "point", "points", "pretty", "price", "problem", "put", "quest", "queue", "random", "rank", "ranked", "rating",
+    "really", "report", "reported", "reward", "rewards", "right", "round", "rounds", "same", "season", "see",
+    "seems", "sell", "server", "servers", "shop", "should", "shouldn't", "show", "since", "skill", "skills", "so",
+    "some", "something", "sometimes", "spawn", "spell", "spells", "stat", "stats", "still", "stop", "strong",
+    "stuck", "such", "sure", "take", "team", "teammate", "teammates", "than", "thank", "thanks", "that", "that's",
+    "thats", "the", "their", "them", "then", "there", "these", "they", "thing", "things", "think", "this", "those",
+    "though", "through", "time", "to", "too", "tower", "toxic", "try", "trying", "two", "ui", "ult", "ultimate",
+    "under", "unfair", "until", "up", "upgrade", "upgrades", "us", "use", "used", "very", "want", "wants", "was",
+    "wasn't", "wave", "waves", "way", "we", "weak", "well", "were", "weren't", "what", "whats", "when", "where",
+    "which", "while", "who", "why", "will", "win", "with", "without", "won't", "wont", "work", "works", "would",
+    "wouldn't", "wrong", "wtf", "xp", "yeah", "yes", "yet", "you", "you're", "your",
+})
+
+FOREIGN_WORDS: Final[FrozenSet[str]] = frozenset({
+    "auch", "avec", "bardzo", "bir", "bitte", "blya", "bu", "che", "chto", "com", "con", "dans", "das", "del",
+    "della", "der", "des", "ein", "eine", "el", "es", "est", "esta", "estan", "este", "está", "eto", "gioco",
+    "gra", "hay", "heroi", "herói", "ich", "igra", "il", "isso", "ist", "için", "jest", "jeu", "joc", "jogar",
+    "jogo", "juego", "kak", "las", "le", "les", "los", "mais", "mas", "mit", "molto", "muito", "muy", "nao", "ne",
+    "nicht", "nie", "non", "nu", "não", "ochen", "oyun", "para", "pas", "pero", "pochemu", "por", "porque", "pour",
+    "pra", "que", "sa", "sehr", "się", "sono", "spiel", "très", "una", "und", "une", "uno", "ve", "ya", "çok",
+    "și",
+})
@@ -0,0 +1,68 @@
+import os
+import re
+from typing import Final
+
+from .language_data import ENGLISH_TRIGRAMS, ENGLISH_WORDS, FOREIGN_WORDS
+
+_WORD_REGEX: Final = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)?")
+
+# share of letters outside of basic latin, after which text is surely not english
+_MAX_NON_ASCII_SHARE: Final = 0.05
+
+
+def _is_ascii_letter(char: str) -> bool:
+    return "a" <= char <= "z"
+
+
+# Estimates how likely `text` is english, in range [0, 1], using character scripts, common words and
+# english trigram coverage. Texts without letters (empty, emoji, numbers) have nothing to translate and count as english
+def english_confidence(text: str) -> float:
+    lowered = text.lower()
+    letters = [char for char in lowered if char.isalpha()]
+    if not letters:
+        return 1.0
+
+    non_ascii = sum(1 for char in letters if not _is_ascii_letter(char))
+    if non_ascii / len(letters) > _MAX_NON_ASCII_SHARE:
+        return 0.0
+
+    words = _WORD_REGEX.findall(lowered)
+    if not words:
+        return 1.0
+
+    english_words = sum(1 for word in words if word in ENGLISH_WORDS)
+    foreign_words = sum(1 for word in words if word in FOREIGN_WORDS)
+
+    trigrams_total = 0
+    trigrams_known = 0
+    for word in words:
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            trigrams_total += 1
+            trigrams_known += padded[i:i + 3] in ENGLISH_TRIGRAMS
+
+    confidence = 0.6 * english_words / len(words) + 0.4 * trigrams_known / trigrams_total
+    confidence *= max(0.0, 1.0 - 2 * foreign_words / len(words))
+    return confidence
+
+
+class LanguagePreDetector:
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self.hits = 0  # confidently english, translation API skipped
+        self.misses = 0  # passed to translation API
+        self.api_english = 0  # API detected english, high values are a sign to lower the threshold
+
+    def is_english(self, text: str) -> bool:
+        if english_confidence(text) >= self.threshold:
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def stats_text(self) -> str:
+        return f"Language pre-detection (threshold {self.threshold}): {self.hits} skipped, {self.misses} passed, " \
+               f"{self.api_english} detected as english by API"
+
+
+detector = LanguagePreDetector(float(os.getenv("LANG_DETECT_THRESHOLD", 0.6)))
@@ -0,0 +1,148 @@
+import asyncio
+from typing import AsyncIterator, Dict, Final, Iterable, List, Optional
+
+from aioredis.errors import RedisError
+from loguru import logger
+
+INDEX_KEY: Final = "link_commands:index"
+VERSION_KEY: Final = "link_commands:version"
+# set once existing commands were indexed, so the keyspace isn't scanned again on every startup
+MIGRATED_KEY: Final = "link_commands:migrated"
+CHANGES_CHANNEL: Final = "link_commands:changed"
+
+_MAX_VALUES: Final = 100
+_VERSION_CHECK_INTERVAL: Final = 60
+_SCAN_COUNT: Final = 200
+_MAX_VALUE_LENGTH: Final = 2000  # values are arguments of a discord message
+
+
+def _escape_pattern(text: str) -> str:
+    return "".join(f"\\{char}" if char in "*?[]\\" else char for char in text)
+
+
+def is_reserved(key: str) -> bool:
+    return "-report-channel-id" in key or "-report-channel-name" in key or key.startswith("link_commands:")
+
+
+def looks_like_link_command(key: str, values: List[bytes]) -> bool:
+    # single-word key typed after `$link`, with a short list of message arguments; namespaced keys (`a:b`)
+    # belong to other features
+    if not key or any(char.isspace() for char in key) or ":" in key or is_reserved(key):
+        return False
+    if not values or len(values) > _MAX_VALUES:
+        return False
+    try:
+        return all(0 < len(value.decode("utf-8")) <= _MAX_VALUE_LENGTH for value in values)
+    except UnicodeDecodeError:
+        return False
+
+
+# Link commands (`$link wiki <url>`) are stored as redis lists and listed in `link_commands:index` sorted set.
+# The whole table is held in memory, so answering a command (or rejecting a miss) needs no redis round trip.
+# Every change bumps `link_commands:version` and is published to `link_commands:changed`, so other replicas
+# reload changed key right away; missed notifications are caught by periodic version check
+class LinkCommands:
+    def __init__(self):
+        self.redis = None
+        self.table: Dict[str, str] = {}
+        self.version: Optional[bytes] = None
+        self.tasks: List[asyncio.Task] = []
+
+    def get(self, key: str) -> Optional[str]:
+        return self.table.get(key)
+
+    # pages over the index with ZSCAN, so listing never blocks redis and touches only link commands
+    async def iter_keys(self, prefix: str = "") -> AsyncIterator[str]:
+        match = f"{_escape_pattern(prefix)}*" if prefix else None
+        async for key, _ in self.redis.izscan(INDEX_KEY, match=match, count=_SCAN_COUNT):
+            yield key.decode("utf-8")
+
+    async def start(self, redis):
+        self.redis = redis
+        if not await redis.exists(MIGRATED_KEY):
+            await self._migrate()
+            await redis.set(MIGRATED_KEY, 1)
+        await self.reload()
+        channel, = await redis.subscribe(CHANGES_CHANNEL)
+        self.tasks = [
+            asyncio.ensure_future(self._listen(channel)),
+            asyncio.ensure_future(self._check_version()),
+        ]
+
+    async def _migrate(self):
+        # commands created before the index existed are plain lists sitting in the keyspace
+        keys = []
+        async for key in self.redis.iscan(count=500):
+            key = key.decode("utf-8", "replace")
+            if is_reserved(key) or ":" in key:
+                continue
+            if await self.redis.type(key) != b"list":
+                continue
+            if looks_like_link_command(key, await self.redis.lrange(key, 0, _MAX_VALUES)):
+                keys.append(key)
+        if keys:
+            await self.redis.zadd(INDEX_KEY, *[value for key in keys for value in (0, key)])
+        logger.info(f"[Links] indexed {len(keys)} existing link commands")
+
+    async def reload(self):
+        version = await self.redis.get(VERSION_KEY)
+        keys = [key.decode("utf-8") for key in await self.redis.zrange(INDEX_KEY)]
+        table = await self._read(keys)
+        self.table = {key: value for key, value in table.items() if value}
+        self.version = version
+        logger.info(f"[Links] loaded {len(self.table)} link commands")
+
+    async def _read(self, keys: Iterable[str]) -> Dict[str, Optional[str]]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        pipe = self.redis.pipeline()
+        for key in keys:
+            pipe.lrange(key, 0, _MAX_VALUES, encoding="utf-8")
+        values = await pipe.execute()
+        return {key: "\n".join(value) if value else None for key, value in zip(keys, values)}
+
+    async def set(self, key: str, values: List[str]):
+        executor = self.redis.multi_exec()
+        executor.delete(key)
+        executor.rpush(key, *values)
+        executor.zadd(INDEX_KEY, 0, key)
+        executor.incr(VERSION_KEY)
+        executor.publish(CHANGES_CHANNEL, key)
+        *_, version, _ = await executor.execute()
+        self.table[key] = "\n".join(values)
+        self.version = str(version).encode()
+
+    async def delete(self, key: str):
+        executor = self.redis.multi_exec()
+        executor.delete(key)
+        executor.zrem(INDEX_KEY, key)
+        executor.incr(VERSION_KEY)
+        executor.publish(CHANGES_CHANNEL, key)
+        *_, version, _ = await executor.execute()
+        self.table.pop(key, None)
+        self.version = str(version).encode()
+
+    async def _refresh(self, key: str):
+        value = (await self._read([key]))[key]
+        if value:
+            self.table[key] = value
+        else:
+            self.table.pop(key, None)
+
+    @logger.catch
+    async def _listen(self, channel):
+        async for key in channel.iter(encoding="utf-8"):
+            try:
+                await self._refresh(key)
+            except RedisError as error:
+                logger.warning(f"[Links] failed to refresh {key}: {error!r}")
+
+    async def _check_version(self):
+        while True:
+            await asyncio.sleep(_VERSION_CHECK_INTERVAL)
+            try:
+                if await self.redis.get(VERSION_KEY) != self.version:
+                    await self.reload()
+            except RedisError as error:
+                logger.warning(f"[Links] version check failed: {error!r}")
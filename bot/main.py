@@ -1,21 +1,32 @@
 import asyncio
-import datetime
-import json
 import os
+from functools import partial
 from typing import Final
 
 from .__load_env import LOCALS_IMPORTED  # True if imported local .env file
 
-import aiohttp
 import aioredis
 import discord
 from aioredis.pubsub import Receiver
 from discord.ext import commands
 from loguru import logger
-
+from arcadia_common import metrics
+
+from . import feedback, github_cache, pagination, reply_targets
+from .github_objects import objects as github_objects
+from .github_scheduler import scheduler as github_scheduler
+from .repo_metadata import repo_metadata
+from .issue_index import issue_index
+from .change_tracker import ChangeTracker
 from .cogs import github_cog, core_cog
 from .enums import BotState
-from .translator import translate
+from .feedback_pool import FeedbackPool
+from .feedback_stream import FeedbackStreamConsumer, STREAM_PREFIX
+from .link_commands import LinkCommands
+from .outbound import OutboundScheduler
+from .steam_profiles import SteamProfiles
+from .transport import transport
+from . import translator
 
 PREFIX: Final = "$" if not LOCALS_IMPORTED else "%"
 token = os.getenv("BOT_TOKEN", None)
@@ -29,7 +40,9 @@ intents.webhooks = False
 intents.members = True
 
 bot = commands.Bot(command_prefix=PREFIX, intents=intents)
-bot.session = aiohttp.ClientSession()
+bot.link_commands = LinkCommands()
+# set once redis and shared services are created in `on_ready`, cogs wait for it before using them
+bot.services_ready = asyncio.Event()
 bot.add_cog(github_cog.Github(bot))
 bot.add_cog(core_cog.Core(bot))
 
@@ -52,6 +65,14 @@ bot.report_channels = {key: None for key in SERVER_LINKS.keys()}
 bot.translation_channel = None
 
 webapi_key = os.getenv("WEBAPI_KEY")
+feedback_workers = int(os.getenv("FEEDBACK_WORKERS", 4))
+feedback_queue_size = int(os.getenv("FEEDBACK_QUEUE_SIZE", 500))
+steam_profile_ttl = int(os.getenv("STEAM_PROFILE_TTL", 6 * 3600))
+feedback_ingest = os.getenv("FEEDBACK_INGEST", "pubsub")  # pubsub | streams
+feedback_batch_linger = float(os.getenv("FEEDBACK_BATCH_LINGER", 0.5))
+metrics_host = os.getenv("METRICS_HOST", "0.0.0.0")
+metrics_port = int(os.getenv("METRICS_PORT", 9100))
+track_changes = os.getenv("BACKUP_TRACK_CHANGES", "1") == "1"
 
 
 @bot.event
@@ -80,16 +101,36 @@ async def on_ready():
         if ch_id and name:
             bot.report_channels[custom_game] = bot.get_channel(int(ch_id))
 
-    receiver = Receiver()
-
-    @logger.catch
-    async def reader(channel):
-        async for ch, message in channel.iter():
-            await send_suggestion(message[1])
-        logger.info("finished reading!")
-
-    bot.task = asyncio.ensure_future(reader(receiver))
-    await bot.redis.psubscribe(receiver.pattern('suggestions:*'))
+    await bot.link_commands.start(bot.redis)
+    if track_changes:
+        bot.change_tracker = ChangeTracker(bot.redis)
+        await bot.change_tracker.start()
+    translator.attach_redis(bot.redis)
+    github_cache.attach_redis(bot.redis)
+    pagination.attach_redis(bot.redis)
+    reply_targets.attach_redis(bot.redis)
+    await github_objects.start(bot.redis)
+    bot.steam_profiles = SteamProfiles(transport.steam, bot.redis, webapi_key, ttl=steam_profile_ttl)
+    bot.outbound = OutboundScheduler(bot, feedback_batch_linger)
+    bot.feedback_pool = FeedbackPool(
+        partial(feedback.prepare_suggestion, bot), partial(feedback.send_suggestion, bot),
+        feedback_workers, feedback_queue_size
+    )
+    bot.feedback_pool.start()
+    metrics.gauge("feedback_queue_depth", "Feedback messages waiting for workers").set_function(
+        bot.feedback_pool.queue.qsize
+    )
+    bot.metrics_runner = await metrics.start_metrics_server(metrics_host, metrics_port)
+    bot.services_ready.set()
+
+    if feedback_ingest == "streams":
+        streams = [f"{STREAM_PREFIX}{custom_game}" for custom_game in SERVER_LINKS.keys()]
+        bot.feedback_stream = FeedbackStreamConsumer(bot.redis, bot.feedback_pool, streams)
+        bot.task = asyncio.ensure_future(bot.feedback_stream.run())
+    else:
+        receiver = Receiver()
+        bot.task = asyncio.ensure_future(feedback.read_pubsub(bot, receiver))
+        await bot.redis.psubscribe(receiver.pattern('suggestions:*'))
 
     __BOT_STATE = BotState.SET
     logger.info(f"[Ready] Finished")
@@ -100,57 +141,30 @@ async def state(ctx):
     await ctx.send(__BOT_STATE)
 
 
-@logger.catch
-async def send_suggestion(message):
-    decoded = json.loads(message)
-    custom_game = decoded["custom_game"]
-    steam_id = decoded["steam_id"]
-    text = decoded["text"]
-
-    logger.info(f"Message from channel {custom_game} by {steam_id}: {text}")
-
-    translated, language = await translate(text)
-
-    report_channel = bot.report_channels.get(custom_game, None)
-    if not report_channel:
+@bot.command()
+async def feedback_stats(ctx):
+    if not getattr(bot, "feedback_pool", None):
+        await ctx.send("Feedback pool isn't running")
         return
+    stats = [
+        bot.feedback_pool.stats_text(),
+        bot.steam_profiles.stats_text(),
+        translator.batcher.stats_text(),
+        translator.detector.stats_text(),
+        bot.outbound.stats_text(),
+    ]
+    if feedback_stream := getattr(bot, "feedback_stream", None):
+        stats.append(feedback_stream.stats_text())
+    await ctx.send("```{}```".format("\n".join(stats)))
 
-    resp = await bot.session.get(
-        f"http://api.steampowered.com/ISteamUser/GetPlayerSummaries/v0002/?key={webapi_key}&steamids={steam_id}"
-    )
-    steam_profile_data = None
-    if resp.status == 200:
-        steam_profile_data = await resp.json()
-
-    profile_avatar_link, profile_name = None, None
-    if steam_profile_data:
-        steam_profile_data = steam_profile_data["response"]["players"][0]
-        profile_avatar_link = steam_profile_data["avatarmedium"]
-        profile_name = steam_profile_data["personaname"]
-
-    embed = discord.Embed(
-        timestamp=datetime.datetime.utcnow(),
-        description=f'```{decoded["text"].strip()}```',
-    )
-    embed.set_author(
-        name=profile_name,
-        url=f"https://steamcommunity.com/profiles/{steam_id}",
-        icon_url=profile_avatar_link or ""
-    )
-    if translated:
-        embed.add_field(name=f"Translation from **{language.upper()}**", value=f"```{translated}```")
-
-    if custom_game == "CustomHeroClash" and steam_id:
-        embed.add_field(
-            name=f"🌟 Reward 🌟",
-            value="\t|\t".join(
-                f"[{i}<:fortune:831077783446749194>](https://chc-2.dota2unofficial.com/api/lua/mail/feedback"
-                f"?steam_id={steam_id}&fortune_value={i})" for i in
-                [5, 10, 25, 50, 100]),
-            inline=False
-        )
 
-    await report_channel.send(embed=embed)
+@bot.command()
+async def github_stats(ctx):
+    stats = [
+        github_scheduler.stats_text(), github_cache.cache.stats_text(), github_objects.stats_text(),
+        repo_metadata.stats_text(), issue_index.stats_text(),
+    ]
+    await ctx.send("```{}```".format("\n".join(stats)))
 
 
 @bot.event
@@ -165,8 +179,7 @@ async def on_message(message):
         return
 
     command_key = message_text.split(" ")[0][1:]
-    if command_value := await bot.redis.lrange(command_key, 0, 100):
-        result = "\n".join([val.decode("utf-8") for val in command_value])
+    if result := bot.link_commands.get(command_key):
         await message.channel.send(result)
 
     await bot.process_commands(message)
@@ -0,0 +1,164 @@
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, Final, List, Tuple
+
+from discord import Embed, TextChannel
+from discord.http import Route
+from loguru import logger
+from arcadia_common import metrics
+
+# discord limits for a single message
+_MAX_EMBEDS: Final = 10
+_MAX_EMBEDS_LENGTH: Final = 6000
+
+# per-channel rate limit of message creation
+_RATE_LIMIT_COUNT: Final = 5
+_RATE_LIMIT_PERIOD: Final = 5.0
+
+# (message id, index of embed in that message)
+SentEmbed = Tuple[int, int]
+_Queued = Tuple[Embed, asyncio.Future, float]
+
+_send_seconds = metrics.histogram("discord_send_seconds", "Latency of sending messages to discord", ["channel"])
+_messages_total = metrics.counter("discord_messages_sent_total", "Messages sent by outbound scheduler", ["channel"])
+_embeds_total = metrics.counter("discord_embeds_sent_total", "Embeds sent by outbound scheduler", ["channel"])
+_send_errors_total = metrics.counter("discord_send_errors_total", "Failed outbound sends", ["channel"])
+_outbox_depth = metrics.gauge("discord_outbox_depth", "Embeds waiting in channel outbox", ["channel"])
+
+
+class _SendBucket:
+    def __init__(self, count: int, period: float):
+        self.count = count
+        self.period = period
+        self.sent: Deque[float] = deque()
+
+    def delay(self) -> float:
+        now = time.monotonic()
+        while self.sent and now - self.sent[0] >= self.period:
+            self.sent.popleft()
+        if len(self.sent) < self.count:
+            return 0.0
+        return self.period - (now - self.sent[0])
+
+    def take(self):
+        self.sent.append(time.monotonic())
+
+
+class ChannelOutbox:
+    def __init__(self, bot, channel: TextChannel, linger: float):
+        self.bot = bot
+        self.channel = channel
+        self.linger = linger
+        self.bucket = _SendBucket(_RATE_LIMIT_COUNT, _RATE_LIMIT_PERIOD)
+        self.queue: Deque[_Queued] = deque()
+        self.wakeup = asyncio.Event()
+        self.task = asyncio.ensure_future(self._run())
+        _outbox_depth.set_function(lambda: len(self.queue), channel=channel.name)
+
+        self.messages_sent = 0
+        self.embeds_sent = 0
+
+    def enqueue(self, embed: Embed) -> asyncio.Future:
+        future = asyncio.get_event_loop().create_future()
+        self.queue.append((embed, future, time.monotonic()))
+        self.wakeup.set()
+        return future
+
+    async def _run(self):
+        while True:
+            await self.wakeup.wait()
+            while self.queue:
+                self.wakeup.clear()
+                # while rate limited, keep accumulating embeds until send slot frees up - a full batch waits too,
+                # sending it early would only get 429 back
+                delay = self.bucket.delay()
+                if delay > 0:
+                    if len(self.queue) < _MAX_EMBEDS:
+                        await self._wait_for_more(delay)
+                    else:
+                        await asyncio.sleep(delay)
+                    continue
+                # backlog is building up without hitting rate limit yet - give it a moment to fill the batch
+                if 1 < len(self.queue) < _MAX_EMBEDS:
+                    deadline = self.queue[0][2] + self.linger - time.monotonic()
+                    if deadline > 0:
+                        await self._wait_for_more(deadline)
+                        continue
+                try:
+                    await self._flush(self._take_batch())
+                except Exception:
+                    logger.exception(f"[Outbound] unexpected error in outbox of {self.channel}")
+
+    async def _wait_for_more(self, timeout: float):
+        try:
+            await asyncio.wait_for(self.wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _take_batch(self) -> List[_Queued]:
+        batch = [self.queue.popleft()]
+        length = len(batch[0][0])
+        while self.queue and len(batch) < _MAX_EMBEDS:
+            next_length = len(self.queue[0][0])
+            if length + next_length > _MAX_EMBEDS_LENGTH:
+                break
+            length += next_length
+            batch.append(self.queue.popleft())
+        return batch
+
+    async def _flush(self, batch: List[_Queued]):
+        self.bucket.take()
+        channel_name = self.channel.name
+        try:
+            with _send_seconds.time(channel=channel_name):
+                message_id = await self._send(batch)
+        except Exception as error:
+            _send_errors_total.inc(channel=channel_name)
+            logger.warning(f"[Outbound] failed to send {len(batch)} embeds to {self.channel}: {error!r}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        self.messages_sent += 1
+        self.embeds_sent += len(batch)
+        _messages_total.inc(channel=channel_name)
+        _embeds_total.inc(len(batch), channel=channel_name)
+        for index, (_, future, _) in enumerate(batch):
+            if not future.done():
+                future.set_result((message_id, index))
+
+    async def _send(self, batch: List[_Queued]) -> int:
+        if len(batch) == 1:
+            message = await self.channel.send(embed=batch[0][0])
+            return message.id
+        # discord.py 1.x `send` accepts only a single embed, posting multiple through raw route
+        route = Route("POST", "/channels/{channel_id}/messages", channel_id=self.channel.id)
+        payload = {"embeds": [embed.to_dict() for embed, _, _ in batch]}
+        data = await self.bot.http.request(route, json=payload)
+        return int(data["id"])
+
+
+# Coalesces embeds sent to the same channel into multi-embed messages once the backlog builds up,
+# so throughput to busy report channels is bound by discord rate limit, not by the number of messages
+class OutboundScheduler:
+    def __init__(self, bot, linger: float = 0.5):
+        self.bot = bot
+        self.linger = linger
+        self.outboxes: Dict[int, ChannelOutbox] = {}
+
+    def enqueue(self, channel: TextChannel, embed: Embed) -> asyncio.Future:
+        outbox = self.outboxes.get(channel.id)
+        if not outbox:
+            outbox = self.outboxes[channel.id] = ChannelOutbox(self.bot, channel, self.linger)
+        return outbox.enqueue(embed)
+
+    async def send(self, channel: TextChannel, embed: Embed) -> SentEmbed:
+        return await self.enqueue(channel, embed)
+
+    def stats_text(self) -> str:
+        return "\n".join(
+            f"Outbox #{outbox.channel}: {len(outbox.queue)} queued, "
+            f"{outbox.embeds_sent} embeds in {outbox.messages_sent} messages"
+            for outbox in self.outboxes.values()
+        ) or "Outbox: nothing sent yet"
@@ -0,0 +1,105 @@
+import asyncio
+import json
+from typing import Dict, Final, Optional, Tuple
+
+from aiohttp import ClientSession
+from cachetools import TTLCache
+from loguru import logger
+
+from .change_tracker import exclude_from_backups
+from .github_integration import format_issue_line, get_issues_list, search_issues
+from .github_scheduler import Priority, current_priority, github_priority
+from .issue_index import issue_index
+
+_CURSOR_PREFIX: Final = "pager:"
+exclude_from_backups(_CURSOR_PREFIX)
+_CURSOR_TTL: Final = 86400
+_PAGE_TTL: Final = 60
+SEARCH_MAX_RESULTS: Final = 1000  # search API doesn't go any deeper
+
+_PageKey = Tuple
+
+
+def _page_key(cursor: dict, page: int) -> _PageKey:
+    return cursor["kind"], cursor["repo"], cursor.get("state") or cursor.get("query"), cursor["per_page"], page
+
+
+# Paging of issue lists and search results. Position of each paged message (cursor) is kept in redis,
+# rendered pages are cached for a short while and the page after the shown one is fetched in background,
+# so flipping forward is answered from memory
+class Pager:
+    def __init__(self):
+        self.redis = None
+        self.pages = TTLCache(maxsize=500, ttl=_PAGE_TTL)
+        # pages being fetched, with scheduler lane of the request
+        self._loading: Dict[_PageKey, Tuple[Priority, asyncio.Future]] = {}
+
+    async def save_cursor(self, message_id: int, cursor: dict):
+        await self.redis.setex(f"{_CURSOR_PREFIX}{message_id}", _CURSOR_TTL, json.dumps(cursor))
+
+    async def load_cursor(self, message_id: int) -> Optional[dict]:
+        raw = await self.redis.get(f"{_CURSOR_PREFIX}{message_id}")
+        return json.loads(raw) if raw else None
+
+    # page is a dict with `description` and, for searches, `total` count of results
+    async def get_page(self, session: ClientSession, cursor: dict, page: int) -> Optional[dict]:
+        key = _page_key(cursor, page)
+        if key in self.pages:
+            return self.pages[key]
+        priority = current_priority()
+        loading = self._loading.get(key)
+        # joining prefetch queued in background lane would make a person wait for it, such page is requested again
+        if loading is None or loading[0] > priority:
+            future = asyncio.ensure_future(self._fetch(session, cursor, page))
+            future.add_done_callback(lambda done: self._forget(key, done))
+            loading = self._loading[key] = priority, future
+        return await asyncio.shield(loading[1])
+
+    def _forget(self, key: _PageKey, future: asyncio.Future):
+        if self._loading.get(key, (None, None))[1] is future:
+            del self._loading[key]
+
+    def prefetch(self, session: ClientSession, cursor: dict, page: int):
+        if self.last_page(cursor) and page > self.last_page(cursor):
+            return
+        with github_priority(Priority.BACKGROUND):
+            asyncio.ensure_future(self.get_page(session, cursor, page))
+
+    @staticmethod
+    def last_page(cursor: dict) -> Optional[int]:
+        total = cursor.get("total")
+        if total is None:
+            return None
+        return max(1, -(-min(total, SEARCH_MAX_RESULTS) // cursor["per_page"]))
+
+    async def _fetch(self, session: ClientSession, cursor: dict, page: int) -> Optional[dict]:
+        if cursor["kind"] == "list":
+            description = await get_issues_list(session, cursor["repo"], cursor["state"], cursor["per_page"], page)
+            if description is None:
+                return None
+            if not description:
+                # nothing past the last page, isn't worth keeping
+                return {"description": description}
+            result = {"description": description}
+        else:
+            details = await issue_index.search(cursor["repo"], cursor["query"], page, cursor["per_page"])
+            if details is None:
+                status, details = await search_issues(
+                    session, cursor["repo"], cursor["query"], page, cursor["per_page"]
+                )
+                if not status:
+                    logger.warning(f"[Pager] search failed: {details}")
+                    return None
+            result = {
+                "description": "\n".join(format_issue_line(item) for item in details["items"]),
+                "total": details["total_count"],
+            }
+        self.pages[_page_key(cursor, page)] = result
+        return result
+
+
+pager = Pager()
+
+
+def attach_redis(redis):
+    pager.redis = redis
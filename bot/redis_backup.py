@@ -1,38 +1,281 @@
+import argparse
 import asyncio
+import gzip
 import json
+from datetime import datetime
 from os import getenv
+from typing import AsyncIterator, Final, IO, Iterable, Iterator, List, Optional
 
 import aioredis
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Backup is a gzipped file with one JSON record per line, starting with a header:
+#   {"snapshot": {"kind": "full|delta", "taken_at": <redis time, ms>, "since": <taken_at of previous snapshot>}}
+#   {"key": ..., "type": "string|list|hash|set|zset|stream", "ttl": <ms, -1 if persistent>, "value": ...}
+#   {"key": ..., "type": "none"} - key was deleted, written by deltas only
+# keys are read in SCAN batches with pipelined TYPE/PTTL + read, so neither side holds the whole dataset in memory.
+# Delta snapshots read only keys recorded in `backup:changelog` by bot's change tracker since previous snapshot,
+# restore applies full snapshot followed by the chain of deltas taken after it
 
-async def save():
-    redis = await aioredis.create_redis(
-        getenv("REDIS_URl"), password=getenv("PWD"), encoding="utf8"
-    )
-    all_keys = await redis.keys("*")
-    all_values = await redis.mget(*all_keys)
+_SCAN_COUNT: Final = 500
+_RESTORE_BATCH: Final = 500
+
+# same as in bot/change_tracker.py
+CHANGELOG_KEY: Final = "backup:changelog"
+LAST_SNAPSHOT_KEY: Final = "backup:last_snapshot"
+
+
+class SnapshotChainError(Exception):
+    pass
+
+
+async def connect():
+    return await aioredis.create_redis(getenv("REDIS_URl"), password=getenv("PWD"), encoding="utf8")
+
+
+def _read_value(pipe, key: str, key_type: str):
+    if key_type == "string":
+        return pipe.get(key)
+    if key_type == "list":
+        return pipe.lrange(key, 0, -1)
+    if key_type == "hash":
+        return pipe.hgetall(key)
+    if key_type == "set":
+        return pipe.smembers(key)
+    if key_type == "zset":
+        return pipe.zrange(key, 0, -1, withscores=True)
+    if key_type == "stream":
+        return pipe.xrange(key)
+    return None
+
+
+def _serialize(key_type: str, value):
+    if key_type == "set":
+        return sorted(value)
+    if key_type == "zset":
+        return [[member, score] for member, score in value]
+    if key_type == "stream":
+        return [[entry_id, fields] for entry_id, fields in value]
+    return value
+
+
+async def dump_keys(redis, keys: List[str], tombstones: bool = False) -> List[dict]:
+    pipe = redis.pipeline()
+    for key in keys:
+        pipe.type(key)
+        pipe.pttl(key)
+    meta = await pipe.execute()
+
+    pipe = redis.pipeline()
+    reads = []
+    deleted = []
+    for key, key_type, ttl in zip(keys, meta[::2], meta[1::2]):
+        future = _read_value(pipe, key, key_type)
+        if future is None:
+            if key_type == "none" and tombstones:
+                deleted.append(key)
+            elif key_type != "none":
+                print(f"Skipping {key} of unsupported type {key_type}")
+            continue
+        reads.append((key, key_type, ttl))
+    values = await pipe.execute()
+
+    records = [{"key": key, "type": "none"} for key in deleted]
+    for (key, key_type, ttl), value in zip(reads, values):
+        # key expired or was deleted between TYPE and read
+        if value is None or (not value and key_type != "string"):
+            if tombstones:
+                records.append({"key": key, "type": "none"})
+            continue
+        records.append({"key": key, "type": key_type, "ttl": ttl, "value": _serialize(key_type, value)})
+    return records
+
+
+def write_records(file: IO[str], records: Iterable[dict]) -> int:
+    count = 0
+    for record in records:
+        file.write(json.dumps(record, ensure_ascii=False))
+        file.write("\n")
+        count += 1
+    return count
+
+
+async def scan_batches(redis, match: Optional[str] = None) -> AsyncIterator[List[str]]:
+    cursor = b"0"
+    while cursor:
+        cursor, keys = await redis.scan(cursor, match=match, count=_SCAN_COUNT)
+        if keys:
+            yield keys
+
+
+async def changed_batches(redis, since: int) -> AsyncIterator[List[str]]:
+    # ZSCAN returns every member present for the whole iteration, even if its score is bumped meanwhile
+    batch = []
+    async for key, changed_at in redis.izscan(CHANGELOG_KEY, count=_SCAN_COUNT):
+        if changed_at >= since:
+            batch.append(key)
+        if len(batch) >= _SCAN_COUNT:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
 
-    final_dict = {}
 
-    for key, value in zip(all_keys, all_values):
-        if value is not None:
-            final_dict[key] = value
+async def redis_time_ms(redis) -> int:
+    return int(await redis.time() * 1000)
+
+
+async def save(path: str, match: Optional[str] = None, incremental: bool = False, redis=None) -> int:
+    # connection passed by caller is left open
+    own_connection = redis is None
+    redis = redis or await connect()
+    count = 0
+    try:
+        # changes made from this moment on are picked up by the next delta, even if this snapshot sees them too
+        taken_at = await redis_time_ms(redis)
+        since = None
+        if incremental:
+            since = await redis.get(LAST_SNAPSHOT_KEY)
+            if since is None:
+                raise SnapshotChainError("No previous snapshot recorded, take a full one first")
+            since = int(since)
+            batches = changed_batches(redis, since)
         else:
-            final_dict[key] = await redis.lrange(key, 0, 100, encoding="utf8")
-    with open("save.json", 'w') as file:
-        json.dump(final_dict, file)
+            batches = scan_batches(redis, match)
 
+        with gzip.open(path, "wt", encoding="utf-8") as file:
+            header = {"kind": "delta" if incremental else "full", "taken_at": taken_at, "since": since}
+            write_records(file, [{"snapshot": header}])
+            async for keys in batches:
+                count += write_records(file, await dump_keys(redis, keys, tombstones=incremental))
+
+        # partial dumps can't serve as a base for deltas
+        if not match:
+            await redis.set(LAST_SNAPSHOT_KEY, taken_at)
+            # everything changed before this snapshot has been read by it
+            await redis.zremrangebyscore(CHANGELOG_KEY, max=taken_at, exclude=redis.ZSET_EXCLUDE_MAX)
+    finally:
+        if own_connection:
+            redis.close()
+            await redis.wait_closed()
+    print(f"Saved {count} keys to {path}")
+    return count
+
+
+def read_header(path: str) -> dict:
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        first = json.loads(file.readline() or "{}")
+    # files written before snapshots had headers are full dumps
+    return first.get("snapshot") or {"kind": "full", "taken_at": None, "since": None}
+
+
+def check_chain(paths: List[str]):
+    headers = [read_header(path) for path in paths]
+    if headers[0]["kind"] != "full":
+        raise SnapshotChainError(f"{paths[0]} is a delta, restore has to start with a full snapshot")
+    for previous, (path, header) in zip(headers, zip(paths[1:], headers[1:])):
+        if header["kind"] != "delta":
+            raise SnapshotChainError(f"{path} is a full snapshot, only deltas may follow the base")
+        if header["since"] != previous["taken_at"]:
+            raise SnapshotChainError(f"{path} doesn't follow previous snapshot, "
+                                     f"since {header['since']} != {previous['taken_at']}")
+
+
+def read_records(path: str) -> Iterator[dict]:
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                record = json.loads(line)
+                if "snapshot" not in record:
+                    yield record
 
-async def restore():
-    # TODO: bgsave
-    pass
+
+def _write_record(pipe, record: dict):
+    key, key_type = record["key"], record["type"]
+    pipe.delete(key)
+    # tombstones of deleted keys carry neither value nor ttl
+    if key_type == "none":
+        return
+    value = record["value"]
+    if key_type == "string":
+        pipe.set(key, value)
+    elif key_type == "list":
+        pipe.rpush(key, *value)
+    elif key_type == "hash":
+        pipe.hmset_dict(key, value)
+    elif key_type == "set":
+        pipe.sadd(key, *value)
+    elif key_type == "zset":
+        pipe.zadd(key, *[item for member, score in value for item in (score, member)])
+    elif key_type == "stream":
+        for entry_id, fields in value:
+            pipe.xadd(key, fields, message_id=entry_id)
+    if record["ttl"] > 0:
+        pipe.pexpire(key, record["ttl"])
+
+
+async def restore_records(redis, records: Iterable[dict]) -> int:
+    count = 0
+    pipe = redis.pipeline()
+    pending = 0
+    for record in records:
+        _write_record(pipe, record)
+        count += 1
+        pending += 1
+        if pending >= _RESTORE_BATCH:
+            await pipe.execute()
+            pipe = redis.pipeline()
+            pending = 0
+    if pending:
+        await pipe.execute()
+    return count
+
+
+async def restore(paths: List[str], redis=None) -> int:
+    check_chain(paths)
+    own_connection = redis is None
+    redis = redis or await connect()
+    count = 0
+    try:
+        for path in paths:
+            restored = await restore_records(redis, read_records(path))
+            print(f"Restored {restored} keys from {path}")
+            count += restored
+    finally:
+        if own_connection:
+            redis.close()
+            await redis.wait_closed()
+    return count
 
 
 def main():
-    asyncio.run(save())
+    parser = argparse.ArgumentParser(description="Streaming backup and restore of bot redis")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    save_parser = subparsers.add_parser("save", help="dump keys into gzipped NDJSON file")
+    save_parser.add_argument("--output", default=None, help="defaults to backup-<full|delta>-<time>.ndjson.gz")
+    save_mode = save_parser.add_mutually_exclusive_group()
+    save_mode.add_argument("--match", default=None, help="only keys matching this SCAN pattern")
+    save_mode.add_argument("--incremental", action="store_true", help="only keys changed since previous snapshot")
+
+    restore_parser = subparsers.add_parser(
+        "restore", help="write keys from full snapshot and deltas taken after it, overwriting existing ones"
+    )
+    restore_parser.add_argument("paths", nargs="+", help="full snapshot followed by deltas, oldest first")
+
+    args = parser.parse_args()
+    try:
+        if args.command == "save":
+            kind = "delta" if args.incremental else "full"
+            output = args.output or f"backup-{kind}-{datetime.utcnow():%Y%m%d-%H%M%S}.ndjson.gz"
+            asyncio.run(save(output, args.match, args.incremental))
+        else:
+            asyncio.run(restore(args.paths))
+    except SnapshotChainError as error:
+        parser.exit(1, f"{error}\n")
 
 
-main()
+if __name__ == "__main__":
+    main()
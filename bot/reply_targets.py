@@ -0,0 +1,57 @@
+import asyncio
+import json
+import os
+from typing import Dict, Final
+
+from loguru import logger
+
+from .change_tracker import exclude_from_backups
+
+_PREFIX: Final = "reply_target:"
+exclude_from_backups(_PREFIX)
+_TTL: Final = int(os.getenv("REPLY_TARGET_TTL", 30 * 86400))
+
+
+# What each embed posted by the bot refers to, keyed by message id and index of embed in that message:
+# issue or PR for issue and unfurl embeds, player and feedback text for feedback embeds.
+# Replies are resolved from here, without fetching the replied message or parsing its embeds
+class ReplyTargets:
+    def __init__(self):
+        self.redis = None
+
+    async def record(self, message_id: int, index: int, target: dict):
+        key = f"{_PREFIX}{message_id}"
+        transaction = self.redis.multi_exec()
+        transaction.hset(key, index, json.dumps(target))
+        transaction.expire(key, _TTL)
+        await transaction.execute()
+
+    async def record_issue(self, message_id: int, repo: str, number, kind: str = "issues"):
+        await self.record(message_id, 0, {"kind": kind, "repo": repo, "number": int(number)})
+
+    async def record_feedback(self, message_id: int, index: int, steam_id: str, text: str):
+        await self.record(message_id, index, {"kind": "feedback", "steam_id": steam_id, "text": text})
+
+    async def get(self, message_id: int) -> Dict[int, dict]:
+        raw = await self.redis.hgetall(f"{_PREFIX}{message_id}", encoding="utf-8")
+        return {int(index): json.loads(target) for index, target in raw.items()}
+
+    def record_sent_feedback(self, sent, steam_id: str, text: str):
+        # done callback of outbound queue future, resolving to (message id, index of embed)
+        if self.redis is None or sent.cancelled() or sent.exception():
+            return
+        message_id, index = sent.result()
+        future = asyncio.ensure_future(self.record_feedback(message_id, index, steam_id, text))
+        future.add_done_callback(_log_failure)
+
+
+def _log_failure(future):
+    if not future.cancelled() and future.exception():
+        logger.warning(f"[Replies] failed to record reply target: {future.exception()!r}")
+
+
+reply_targets = ReplyTargets()
+
+
+def attach_redis(redis):
+    reply_targets.redis = redis
@@ -0,0 +1,73 @@
+import json
+from typing import Dict, Final, List, NamedTuple, Optional
+
+from aiohttp import ClientSession
+from loguru import logger
+
+from .change_tracker import exclude_from_backups
+from .github_integration import excluded_global_repos, get_repos, preset_repos_reverse
+
+_REDIS_KEY: Final = "github:repos"
+exclude_from_backups(_REDIS_KEY)
+
+
+class RepoRecord(NamedTuple):
+    name: str
+    private: bool
+    alias: Optional[str]
+
+
+# Repositories of the organization, looked up by name or preset alias (case-insensitive) without API calls.
+# Records are kept in redis, so restarted bot has them right away, and refreshed in background
+class RepoIndex:
+    def __init__(self):
+        self.records: List[RepoRecord] = []
+        self.by_name: Dict[str, RepoRecord] = {}
+        self.by_alias: Dict[str, RepoRecord] = {}
+        self.redis = None
+
+    def __bool__(self):
+        return bool(self.records)
+
+    def _set_records(self, records: List[RepoRecord]):
+        self.records = sorted(records, key=lambda record: record.name.lower())
+        self.by_name = {record.name.lower(): record for record in self.records}
+        self.by_alias = {record.alias: record for record in self.records if record.alias}
+
+    def get(self, name: str) -> Optional[RepoRecord]:
+        return self.by_name.get(name.lower())
+
+    def resolve(self, name_or_alias: str) -> Optional[RepoRecord]:
+        key = name_or_alias.lower()
+        return self.by_alias.get(key) or self.by_name.get(key)
+
+    def listing(self) -> str:
+        return "\n".join(
+            f'`{record.name}{f" [{record.alias}]" if record.alias else ""}`'
+            for record in self.records if record.name not in excluded_global_repos
+        )
+
+    async def load(self, redis):
+        self.redis = redis
+        raw = await redis.get(_REDIS_KEY)
+        if raw:
+            self._set_records([RepoRecord(*record) for record in json.loads(raw)])
+            logger.info(f"[Repos] loaded {len(self.records)} repositories from redis")
+
+    async def refresh(self, session: ClientSession) -> bool:
+        status, response = await get_repos(session)
+        if not status:
+            logger.warning(f"[Repos] failed to fetch org repositories: {response}")
+            return False
+        records = [
+            RepoRecord(repo["name"], repo["private"], preset_repos_reverse.get(repo["name"]))
+            for repo in response
+        ]
+        self._set_records(records)
+        if self.redis:
+            await self.redis.set(_REDIS_KEY, json.dumps([list(record) for record in self.records]))
+        logger.info(f"[Repos] indexed {len(self.records)} repositories")
+        return True
+
+
+repo_index = RepoIndex()
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import time
+from typing import Dict, Final, Iterable, Optional, Set
+
+from aiohttp import ClientSession
+from loguru import logger
+
+from .github_integration import get_arcadia_team_members, get_repo_labels, get_repo_milestones
+
+# published by webhook listener on `label`, `milestone` and `membership` events
+EVENTS_CHANNEL: Final = "github:metadata"
+# lookup misses refetch repo at most this often (seconds), unknown names typed by people shouldn't burn rate limit
+_MISS_REFRESH_INTERVAL: Final = 60
+
+
+def normalize_title(title: str) -> str:
+    return " ".join(title.lower().replace('"', "").split())
+
+
+class RepoMetadata:
+    def __init__(self, labels: Iterable[dict], milestones: Iterable[dict]):
+        self.labels: Dict[str, dict] = {label["name"].lower(): label for label in labels}
+        self.milestones: Dict[str, dict] = {
+            normalize_title(milestone["title"]): milestone for milestone in milestones
+        }
+
+
+# Labels and open milestones of repositories, and members of the arcadia team, held in memory so that label,
+# milestone and assignee resolution are dictionary lookups. Refreshes revalidate by ETag (unchanged lists cost
+# no rate limit), webhook events make the bot refetch affected repo right away
+class MetadataIndex:
+    def __init__(self):
+        self.repos: Dict[str, RepoMetadata] = {}
+        self.team_members: Dict[str, str] = {}  # lowercase login -> login
+        self.task: Optional[asyncio.Task] = None
+        self._loading: Dict[str, asyncio.Future] = {}
+        self._refreshed_at: Dict[str, float] = {}
+
+    async def refresh_repo(self, session: ClientSession, repo: str) -> bool:
+        (labels_status, labels), (milestones_status, milestones) = await asyncio.gather(
+            get_repo_labels(session, repo), get_repo_milestones(session, repo)
+        )
+        if not labels_status or not milestones_status:
+            error = labels if not labels_status else milestones
+            logger.warning(f"[Metadata] failed to fetch metadata of {repo}: {error}")
+            return False
+        self.repos[repo] = RepoMetadata(labels, milestones)
+        self._refreshed_at[repo] = time.monotonic()
+        return True
+
+    async def refresh_team(self, session: ClientSession) -> bool:
+        status, members = await get_arcadia_team_members(session)
+        if not status:
+            logger.warning(f"[Metadata] failed to fetch team members: {members}")
+            return False
+        self.team_members = {member["login"].lower(): member["login"] for member in members}
+        return True
+
+    async def refresh(self, session: ClientSession, repos: Iterable[str]):
+        await asyncio.gather(self.refresh_team(session), *[self.refresh_repo(session, repo) for repo in repos])
+
+    # metadata of repos outside of preloaded ones is fetched on first use, concurrent callers share the request
+    async def ensure(self, session: ClientSession, repo: str) -> Optional[RepoMetadata]:
+        if repo in self.repos:
+            return self.repos[repo]
+        return await self._load(session, repo)
+
+    async def _load(self, session: ClientSession, repo: str) -> Optional[RepoMetadata]:
+        if repo not in self._loading:
+            # failed attempts count too, so API errors don't turn every miss into a request
+            self._refreshed_at[repo] = time.monotonic()
+            self._loading[repo] = asyncio.ensure_future(self.refresh_repo(session, repo))
+            self._loading[repo].add_done_callback(lambda _: self._loading.pop(repo, None))
+        await asyncio.shield(self._loading[repo])
+        return self.repos.get(repo)
+
+    # label or milestone created since the last refresh is missing from the index until webhook event or
+    # periodic refresh arrives, so a miss refetches the repo once before the name is rejected
+    async def _lookup(self, session: ClientSession, repo: str, find) -> Optional[dict]:
+        metadata = await self.ensure(session, repo)
+        if metadata and (found := find(metadata)):
+            return found
+        if time.monotonic() - self._refreshed_at.get(repo, 0) < _MISS_REFRESH_INTERVAL:
+            return None
+        metadata = await self._load(session, repo)
+        return find(metadata) if metadata else None
+
+    async def milestone(self, session: ClientSession, repo: str, title: str) -> Optional[dict]:
+        return await self._lookup(session, repo, lambda metadata: metadata.milestones.get(normalize_title(title)))
+
+    async def label(self, session: ClientSession, repo: str, name: str) -> Optional[dict]:
+        return await self._lookup(session, repo, lambda metadata: metadata.labels.get(name.lower()))
+
+    def add_label(self, repo: str, label: dict):
+        if repo in self.repos:
+            self.repos[repo].labels[label["name"].lower()] = label
+
+    def unknown_assignees(self, logins: Iterable[str]) -> Set[str]:
+        # nothing to validate against until team is loaded
+        if not self.team_members:
+            return set()
+        return {login for login in logins if login and login.lower() not in self.team_members}
+
+    async def start(self, redis, session: ClientSession):
+        channel, = await redis.subscribe(EVENTS_CHANNEL)
+        self.task = asyncio.ensure_future(self._listen(channel, session))
+
+    @logger.catch
+    async def _listen(self, channel, session: ClientSession):
+        async for raw in channel.iter(encoding="utf-8"):
+            try:
+                event = json.loads(raw)
+            except ValueError:
+                logger.warning(f"[Metadata] malformed event: {raw!r}")
+                continue
+            if event.get("kind") == "membership":
+                await self.refresh_team(session)
+            elif event.get("repo") in self.repos:
+                await self.refresh_repo(session, event["repo"])
+
+    def stats_text(self) -> str:
+        return f"Metadata: {len(self.repos)} repos, {len(self.team_members)} team members"
+
+
+repo_metadata = MetadataIndex()
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import time
+from typing import Dict, Final, Iterable, List, Optional, Set
+
+from aiohttp import ClientError, ClientSession
+from cachetools import LRUCache
+from loguru import logger
+from arcadia_common import metrics
+
+from .change_tracker import exclude_from_backups
+
+_SUMMARIES_URL: Final = "http://api.steampowered.com/ISteamUser/GetPlayerSummaries/v0002/"
+_MAX_IDS_PER_REQUEST: Final = 100  # GetPlayerSummaries limit
+_REDIS_KEY: Final = "steam_profiles"
+exclude_from_backups(_REDIS_KEY)
+
+_lookups_total = metrics.counter("steam_profile_lookups_total", "Steam profile lookups by cache result", ["result"])
+_requests_total = metrics.counter("steam_requests_total", "GetPlayerSummaries requests by status", ["status"])
+_request_seconds = metrics.histogram("steam_request_seconds", "GetPlayerSummaries request latency")
+
+
+def _chunks(items: List[str], size: int) -> Iterable[List[str]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+# Profiles are kept in a process-local LRU backed by `steam_profiles` redis hash. Lookups arriving within
+# `batch_window` are coalesced into one GetPlayerSummaries request, stale profiles are served while refreshing
+class SteamProfiles:
+    def __init__(self, session: ClientSession, redis, api_key: str, ttl: float = 6 * 3600,
+                 stale_ttl: float = 7 * 86400, batch_window: float = 0.05, cache_size: int = 5000):
+        self.session = session
+        self.redis = redis
+        self.api_key = api_key
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.batch_window = batch_window
+        self.memory = LRUCache(maxsize=cache_size)
+
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._refreshing: Set[str] = set()
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.requests = 0
+
+    async def get(self, steam_id: str) -> Optional[dict]:
+        if not steam_id:
+            return None
+        steam_id = str(steam_id)
+        profile = self.memory.get(steam_id)
+        if profile:
+            age = time.time() - profile["fetched_at"]
+            if age < self.ttl:
+                self.hits += 1
+                _lookups_total.inc(result="hit")
+                return profile
+            if age < self.stale_ttl:
+                self.stale_hits += 1
+                _lookups_total.inc(result="stale")
+                self._refresh(steam_id)
+                return profile
+        self.misses += 1
+        _lookups_total.inc(result="miss")
+        return await asyncio.shield(self._enqueue(steam_id))
+
+    def stats_text(self) -> str:
+        return f"Steam profiles: {self.hits} hits, {self.stale_hits} stale, {self.misses} misses, " \
+               f"{self.requests} API requests"
+
+    def _refresh(self, steam_id: str):
+        if steam_id in self._refreshing:
+            return
+        self._refreshing.add(steam_id)
+        self._enqueue(steam_id).add_done_callback(lambda _: self._refreshing.discard(steam_id))
+
+    def _enqueue(self, steam_id: str) -> asyncio.Future:
+        future = self._pending.get(steam_id)
+        if future:
+            return future
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        self._pending[steam_id] = future
+        if len(self._pending) >= _MAX_IDS_PER_REQUEST:
+            self._flush()
+        elif not self._flush_handle:
+            self._flush_handle = loop.call_later(self.batch_window, self._flush)
+        return future
+
+    def _flush(self):
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            asyncio.ensure_future(self._resolve(batch))
+
+    async def _resolve(self, batch: Dict[str, asyncio.Future]):
+        results: Dict[str, Optional[dict]] = {}
+        try:
+            now = time.time()
+            to_fetch = []
+            stored = await self.redis.hmget(_REDIS_KEY, *batch.keys())
+            for steam_id, raw in zip(batch.keys(), stored):
+                profile = json.loads(raw) if raw else None
+                if profile and now - profile["fetched_at"] < self.stale_ttl:
+                    self.memory[steam_id] = profile
+                    results[steam_id] = profile
+                if not profile or now - profile["fetched_at"] >= self.ttl:
+                    to_fetch.append(steam_id)
+
+            # stored profiles are good enough for waiting callers, outdated ones are refreshed right after
+            for steam_id, profile in results.items():
+                if not batch[steam_id].done():
+                    batch[steam_id].set_result(profile)
+
+            if to_fetch:
+                fetched = await asyncio.gather(
+                    *[self._fetch(chunk) for chunk in _chunks(to_fetch, _MAX_IDS_PER_REQUEST)]
+                )
+                profiles = {}
+                for chunk, players in zip(_chunks(to_fetch, _MAX_IDS_PER_REQUEST), fetched):
+                    if players is None:
+                        continue
+                    for steam_id in chunk:
+                        player = players.get(steam_id, {})
+                        profiles[steam_id] = {
+                            "name": player.get("personaname"),
+                            "avatar": player.get("avatarmedium"),
+                            "fetched_at": now,
+                        }
+                if profiles:
+                    self.memory.update(profiles)
+                    results.update(profiles)
+                    await self.redis.hmset_dict(
+                        _REDIS_KEY, {steam_id: json.dumps(profile) for steam_id, profile in profiles.items()}
+                    )
+        except Exception:
+            logger.exception("[Steam] failed to resolve profiles")
+        finally:
+            for steam_id, future in batch.items():
+                if not future.done():
+                    future.set_result(results.get(steam_id))
+
+    async def _fetch(self, steam_ids: List[str]) -> Optional[Dict[str, dict]]:
+        self.requests += 1
+        params = {"key": self.api_key, "steamids": ",".join(steam_ids)}
+        try:
+            with _request_seconds.time():
+                async with self.session.get(_SUMMARIES_URL, params=params) as resp:
+                    _requests_total.inc(status=resp.status)
+                    if resp.status != 200:
+                        logger.warning(f"[Steam] GetPlayerSummaries failed with status {resp.status}")
+                        return None
+                    data = await resp.json()
+        except (ClientError, asyncio.TimeoutError) as error:
+            _requests_total.inc(status="error")
+            logger.warning(f"[Steam] GetPlayerSummaries request failed: {error!r}")
+            return None
+        return {player["steamid"]: player for player in data["response"]["players"]}
@@ -1,22 +1,211 @@
+import asyncio
+import json
 import os
+from hashlib import sha256
+from typing import Dict, Final, List, Optional, Tuple
+
+from cachetools import LRUCache
 from google.cloud.translate import TranslationServiceAsyncClient
+from loguru import logger
+from arcadia_common import metrics
+
+from .change_tracker import exclude_from_backups
+from .language_detect import detector
 
 os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = os.getcwd() + f"/bot/{os.getenv('GOOGLE_PROJECT_CREDS_FILENAME', '')}"
 
-client = TranslationServiceAsyncClient()
+# created on first use, so importing the module doesn't require credentials (benchmarks swap in a stub client)
+client: Optional[TranslationServiceAsyncClient] = None
 parent = f"projects/{os.getenv('GOOGLE_PROJECT_API', '')}/locations/global"
 
+# translate_text request limits
+_MAX_BATCH_ITEMS: Final = 1024
+_MAX_BATCH_CODEPOINTS: Final = 30000
+_BATCH_WINDOW: Final = 0.05
+_CACHE_TTL: Final = int(os.getenv("TRANSLATION_CACHE_TTL", 7 * 86400))
+exclude_from_backups("translation:")
+
+_Translation = Tuple[Optional[str], Optional[str]]
+_Pending = Tuple[str, str, asyncio.Future]
+
+_lookups_total = metrics.counter(
+    "translation_lookups_total", "Translation lookups by the stage that answered them", ["result"]
+)
+_api_seconds = metrics.histogram("translation_api_seconds", "Latency of translate_text requests")
+_api_batch_size = metrics.histogram(
+    "translation_api_batch_size", "Texts packed into one translate_text request",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 1024)
+)
+_api_codepoints_total = metrics.counter("translation_api_codepoints_total", "Codepoints sent to translation API")
+
+
+def get_client() -> TranslationServiceAsyncClient:
+    global client
+    if client is None:
+        client = TranslationServiceAsyncClient()
+    return client
+
+
+class _TranslationBatcher:
+    def __init__(self):
+        self.memory = LRUCache(maxsize=10000)
+        self.redis = None
+
+        self._pending: Dict[str, _Pending] = {}
+        self._pending_codepoints = 0
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+        self.memory_hits = 0
+        self.redis_hits = 0
+        self.api_requests = 0
+        self.api_codepoints = 0
+
+    async def translate(self, text: str) -> _Translation:
+        # the text sent is exactly the one hashed, so equal keys always stand for equal translations
+        text = text.strip()
+        if len(text) > _MAX_BATCH_CODEPOINTS:
+            return await self._translate_split(text)
+        key = sha256(text.encode("utf-8")).hexdigest()
+        if key in self.memory:
+            self.memory_hits += 1
+            _lookups_total.inc(result="memory")
+            return self.memory[key]
+        return await asyncio.shield(self._enqueue(key, text))
+
+    async def _translate_split(self, text: str) -> _Translation:
+        # single request can't carry text over codepoint budget, its parts are translated separately
+        parts = _split_text(text, _MAX_BATCH_CODEPOINTS)
+        results = await asyncio.gather(*[self.translate(part) for part in parts])
+        languages = [language for _, language in results if language]
+        if not languages:
+            return None, None
+        # english parts (and failed ones) keep original wording
+        return "\n".join(translated or part for part, (translated, _) in zip(parts, results)), languages[0]
+
+    def _enqueue(self, key: str, text: str) -> asyncio.Future:
+        if key in self._pending:
+            return self._pending[key][2]
+        if self._pending_codepoints + len(text) > _MAX_BATCH_CODEPOINTS:
+            self._flush()
+
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        self._pending[key] = (key, text, future)
+        self._pending_codepoints += len(text)
+
+        if len(self._pending) >= _MAX_BATCH_ITEMS:
+            self._flush()
+        elif not self._flush_handle:
+            self._flush_handle = loop.call_later(_BATCH_WINDOW, self._flush)
+        return future
+
+    def _flush(self):
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch = list(self._pending.values())
+        self._pending = {}
+        self._pending_codepoints = 0
+        if batch:
+            asyncio.ensure_future(self._resolve(batch))
+
+    async def _resolve(self, batch: List[_Pending]):
+        try:
+            await self._resolve_batch(batch)
+        except Exception:
+            logger.exception(f"[Translation] failed to resolve batch of {len(batch)}")
+        finally:
+            # callers of anything left unresolved get no translation instead of waiting forever
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_result((None, None))
+
+    async def _resolve_batch(self, batch: List[_Pending]):
+        missing = batch
+        if self.redis:
+            try:
+                stored = await self.redis.mget(*[f"translation:{key}" for key, _, _ in batch])
+            except Exception:
+                logger.exception("[Translation] failed to read cache")
+                stored = [None] * len(batch)
+            missing = []
+            for (key, text, future), raw in zip(batch, stored):
+                if raw is None:
+                    missing.append((key, text, future))
+                    continue
+                self.redis_hits += 1
+                _lookups_total.inc(result="redis")
+                result = tuple(json.loads(raw))
+                self.memory[key] = result
+                future.set_result(result)
+
+        if not missing:
+            return
+        _lookups_total.inc(len(missing), result="api")
+        _api_batch_size.observe(len(missing))
+        with _api_seconds.time():
+            response = await get_client().translate_text(
+                request={
+                    "parent": parent,
+                    "contents": [text for _, text, _ in missing],
+                    "mime_type": "text/plain",  # mime types: text/plain, text/html
+                    "target_language_code": "en-US",
+                }
+            )
+        codepoints = sum(len(text) for _, text, _ in missing)
+        self.api_requests += 1
+        self.api_codepoints += codepoints
+        _api_codepoints_total.inc(codepoints)
+
+        results = {}
+        for (key, _, future), translation in zip(missing, response.translations):
+            if translation.detected_language_code == "en":
+                detector.api_english += 1
+                result = (None, None)
+            else:
+                result = (translation.translated_text, translation.detected_language_code)
+            self.memory[key] = result
+            results[key] = result
+            future.set_result(result)
+
+        if self.redis:
+            pipe = self.redis.pipeline()
+            for key, result in results.items():
+                pipe.setex(f"translation:{key}", _CACHE_TTL, json.dumps(result))
+            try:
+                await pipe.execute()
+            except Exception:
+                logger.exception("[Translation] failed to write cache")
+
+    def stats_text(self) -> str:
+        return f"Translations: {self.memory_hits} memory hits, {self.redis_hits} redis hits, " \
+               f"{self.api_requests} API requests ({self.api_codepoints} codepoints)"
+
+
+def _split_text(text: str, limit: int) -> List[str]:
+    # pieces of at most `limit` codepoints, cut at line breaks or spaces where possible
+    parts = []
+    while len(text) > limit:
+        cut = text.rfind("\n", 0, limit)
+        if cut <= 0:
+            cut = text.rfind(" ", 0, limit)
+        if cut <= 0:
+            cut = limit
+        parts.append(text[:cut].strip())
+        text = text[cut:].strip()
+    parts.append(text)
+    return [part for part in parts if part]
+
+
+batcher = _TranslationBatcher()
+
+
+def attach_redis(redis):
+    batcher.redis = redis
+
 
-async def translate(input_text: str):
-    response = await client.translate_text(
-        request={
-            "parent": parent,
-            "contents": [input_text],
-            "mime_type": "text/plain",  # mime types: text/plain, text/html
-            "target_language_code": "en-US",
-        }
-    )
-    result = response.translations[0]
-    if result.detected_language_code == "en":
+async def translate(input_text: str) -> _Translation:
+    if detector.is_english(input_text):
+        _lookups_total.inc(result="local_english")
         return None, None
-    return result.translated_text, result.detected_language_code
+    return await batcher.translate(input_text)
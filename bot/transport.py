@@ -0,0 +1,105 @@
+import time
+from types import SimpleNamespace
+from typing import Dict, Final, NamedTuple
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector, TraceConfig
+from loguru import logger
+from arcadia_common import metrics
+
+_connections_total = metrics.counter("http_connections_total", "Connections taken for outgoing requests",
+                                     ["upstream", "host", "reused"])
+_ttfb_seconds = metrics.histogram("http_ttfb_seconds", "Time from sending request to receiving response headers",
+                                  ["upstream", "host"])
+_request_errors_total = metrics.counter("http_request_errors_total", "Outgoing requests failed without response",
+                                        ["upstream", "host", "error"])
+
+
+class Upstream(NamedTuple):
+    limit: int  # simultaneous connections
+    limit_per_host: int
+    keepalive: float  # seconds idle connection is kept open
+    timeout: ClientTimeout
+
+
+UPSTREAMS: Final = {
+    # API calls are small, connection budget matches concurrency of github scheduler
+    "github": Upstream(16, 16, 60, ClientTimeout(total=30, connect=5, sock_read=20)),
+    # profile lookups are batched, a hung call must not hold feedback reader for longer than this
+    "steam": Upstream(4, 4, 30, ClientTimeout(total=10, connect=3, sock_read=7)),
+    "chc": Upstream(4, 4, 30, ClientTimeout(total=15, connect=5, sock_read=10)),
+    # attachment downloads can be large, only connecting and stalling are bounded tightly
+    "discord_cdn": Upstream(8, 4, 15, ClientTimeout(total=120, connect=5, sock_read=30)),
+}
+
+
+def _trace_config(upstream: str) -> TraceConfig:
+    trace_config = TraceConfig()
+
+    async def on_request_start(session, context: SimpleNamespace, params):
+        context.started_at = time.perf_counter()
+        context.host = params.url.host
+
+    async def on_request_end(session, context: SimpleNamespace, params):
+        # fires once response headers are read, body is not awaited yet
+        _ttfb_seconds.observe(time.perf_counter() - context.started_at, upstream=upstream, host=context.host)
+
+    async def on_request_exception(session, context: SimpleNamespace, params):
+        _request_errors_total.inc(upstream=upstream, host=context.host, error=type(params.exception).__name__)
+
+    async def on_connection_create_end(session, context: SimpleNamespace, params):
+        _connections_total.inc(upstream=upstream, host=context.host, reused="false")
+
+    async def on_connection_reuseconn(session, context: SimpleNamespace, params):
+        _connections_total.inc(upstream=upstream, host=context.host, reused="true")
+
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_request_exception.append(on_request_exception)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+    return trace_config
+
+
+# One HTTP session per upstream service, each with own connection pool, keep-alive, DNS cache and timeouts,
+# so slow or hung service can't starve others. Sessions are created on first use, inside the running loop
+class Transport:
+    def __init__(self):
+        self.sessions: Dict[str, ClientSession] = {}
+
+    def session(self, upstream: str) -> ClientSession:
+        session = self.sessions.get(upstream)
+        if session is None or session.closed:
+            settings = UPSTREAMS[upstream]
+            connector = TCPConnector(
+                limit=settings.limit, limit_per_host=settings.limit_per_host,
+                keepalive_timeout=settings.keepalive, ttl_dns_cache=300,
+            )
+            session = self.sessions[upstream] = ClientSession(
+                connector=connector, timeout=settings.timeout, trace_configs=[_trace_config(upstream)]
+            )
+            logger.info(f"[Transport] created session for {upstream}")
+        return session
+
+    @property
+    def github(self) -> ClientSession:
+        return self.session("github")
+
+    @property
+    def steam(self) -> ClientSession:
+        return self.session("steam")
+
+    @property
+    def chc(self) -> ClientSession:
+        return self.session("chc")
+
+    @property
+    def discord_cdn(self) -> ClientSession:
+        return self.session("discord_cdn")
+
+    async def close(self):
+        for session in self.sessions.values():
+            await session.close()
+        self.sessions.clear()
+
+
+transport = Transport()
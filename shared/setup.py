@@ -0,0 +1,9 @@
+from setuptools import setup
+
+# code shared by the bot and the webhook listener, installed into both images
+setup(
+    name="arcadia-common",
+    version="1.0.0",
+    packages=["arcadia_common"],
+    install_requires=["aiohttp", "loguru"],
+)
@@ -0,0 +1,220 @@
+import asyncio
+import copy
+import fnmatch
+import os
+import tempfile
+import time
+import unittest
+from typing import Dict, Optional, Tuple
+
+from bot import redis_backup
+
+# Round trip of bot/redis_backup.py against an in-memory Redis stand-in: full snapshot, changes recorded in the
+# changelog the way bot's change tracker does (updates, new keys, deletions), delta snapshot, then restore
+# of the chain into another instance, which has to end up equal to the source.
+#   python -m unittest discover tests
+
+
+class FakeRedis:
+    ZSET_EXCLUDE_MAX = "ZSET_EXCLUDE_MAX"
+
+    def __init__(self):
+        self.data: Dict[str, Tuple[str, object]] = {}  # key -> (type, value)
+        self.ttls: Dict[str, int] = {}
+        self.closed = False
+
+    # snapshot-relevant state, changelog and snapshot marker are bookkeeping of the source only
+    def contents(self) -> dict:
+        return {key: entry for key, entry in self.data.items() if not key.startswith("backup:")}
+
+    async def time(self) -> float:
+        return time.time()
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self.data.get(key)
+        return entry[1] if entry and entry[0] == "string" else None
+
+    async def set(self, key: str, value):
+        self.data[key] = ("string", str(value))
+
+    async def scan(self, cursor, match: Optional[str] = None, count: int = 10):
+        keys = sorted(key for key in self.data if match is None or fnmatch.fnmatchcase(key, match))
+        start = int(cursor)
+        batch = keys[start:start + count]
+        next_cursor = start + count if start + count < len(keys) else 0
+        return next_cursor, batch
+
+    async def izscan(self, key: str, count: int = 10):
+        for member, score in list(self.data.get(key, ("zset", {}))[1].items()):
+            yield member, score
+
+    async def zremrangebyscore(self, key: str, max: float, exclude=None):
+        members = self.data.get(key, ("zset", {}))[1]
+        for member, score in list(members.items()):
+            if score < max:
+                del members[member]
+
+    def record_change(self, key: str):
+        # what change tracker writes for every keyspace event
+        self.data.setdefault(redis_backup.CHANGELOG_KEY, ("zset", {}))[1][key] = int(time.time() * 1000)
+
+    def delete_key(self, key: str):
+        self.data.pop(key, None)
+        self.ttls.pop(key, None)
+
+    def pipeline(self):
+        return _FakePipeline(self)
+
+    def close(self):
+        self.closed = True
+
+    async def wait_closed(self):
+        pass
+
+
+class _FakePipeline:
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        command = getattr(self, f"_{name}")
+
+        # stands for the future real pipeline returns, callers only check it isn't None
+        def queue(*args, **kwargs):
+            self.commands.append((command, args, kwargs))
+            return len(self.commands)
+        return queue
+
+    async def execute(self):
+        return [command(*args, **kwargs) for command, args, kwargs in self.commands]
+
+    def _value(self, key: str, key_type: str):
+        entry = self.redis.data.get(key)
+        return copy.deepcopy(entry[1]) if entry and entry[0] == key_type else None
+
+    def _type(self, key: str) -> str:
+        entry = self.redis.data.get(key)
+        return entry[0] if entry else "none"
+
+    def _pttl(self, key: str) -> int:
+        if key not in self.redis.data:
+            return -2
+        return self.redis.ttls.get(key, -1)
+
+    def _get(self, key: str):
+        return self._value(key, "string")
+
+    def _lrange(self, key: str, start: int, stop: int):
+        return self._value(key, "list") or []
+
+    def _hgetall(self, key: str):
+        return self._value(key, "hash") or {}
+
+    def _smembers(self, key: str):
+        return list(self._value(key, "set") or [])
+
+    def _zrange(self, key: str, start: int, stop: int, withscores: bool = False):
+        return sorted((self._value(key, "zset") or {}).items(), key=lambda item: item[1])
+
+    def _delete(self, key: str):
+        self.redis.delete_key(key)
+
+    def _set(self, key: str, value):
+        self.redis.data[key] = ("string", value)
+
+    def _rpush(self, key: str, *values):
+        self.redis.data.setdefault(key, ("list", []))[1].extend(values)
+
+    def _hmset_dict(self, key: str, values: dict):
+        self.redis.data.setdefault(key, ("hash", {}))[1].update(values)
+
+    def _sadd(self, key: str, *members):
+        self.redis.data.setdefault(key, ("set", set()))[1].update(members)
+
+    def _zadd(self, key: str, *pairs):
+        members = self.redis.data.setdefault(key, ("zset", {}))[1]
+        for score, member in zip(pairs[::2], pairs[1::2]):
+            members[member] = score
+
+    def _pexpire(self, key: str, ttl: int):
+        self.redis.ttls[key] = ttl
+
+
+def _fill(redis: FakeRedis, keys: int):
+    for i in range(keys):
+        redis.data[f"string:{i}"] = ("string", f"value {i}")
+        redis.data[f"list:{i}"] = ("list", [f"a{i}", f"b{i}"])
+        redis.data[f"hash:{i}"] = ("hash", {"field": f"{i}", "other": "x"})
+        redis.data[f"set:{i}"] = ("set", {f"m{i}", "shared"})
+        redis.data[f"zset:{i}"] = ("zset", {f"m{i}": float(i), "shared": 0.5})
+    redis.ttls["string:0"] = 60_000
+
+
+def _mutate(redis: FakeRedis, keys: int):
+    for i in range(0, keys, 3):
+        redis.data[f"hash:{i}"][1]["field"] = "changed"
+        redis.record_change(f"hash:{i}")
+    for i in range(1, keys, 3):
+        redis.delete_key(f"list:{i}")
+        redis.record_change(f"list:{i}")
+    for i in range(keys, keys + keys // 2):
+        redis.data[f"string:{i}"] = ("string", f"new {i}")
+        redis.record_change(f"string:{i}")
+    # created and deleted again between snapshots
+    redis.record_change("transient")
+
+
+def _normalize(contents: dict) -> dict:
+    normalized = {}
+    for key, (key_type, value) in contents.items():
+        if key_type == "set":
+            value = sorted(value)
+        elif key_type == "zset":
+            value = {member: float(score) for member, score in value.items()}
+        normalized[key] = (key_type, value)
+    return normalized
+
+
+class RedisBackupTest(unittest.IsolatedAsyncioTestCase):
+    KEYS = 200
+
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.full_path = os.path.join(self.directory.name, "full.ndjson.gz")
+        self.delta_path = os.path.join(self.directory.name, "delta.ndjson.gz")
+        self.source = FakeRedis()
+        _fill(self.source, self.KEYS)
+
+    async def asyncTearDown(self):
+        self.directory.cleanup()
+
+    async def _save_chain(self):
+        await redis_backup.save(self.full_path, redis=self.source)
+        await asyncio.sleep(0.01)  # changes have to be timestamped after the full snapshot
+        _mutate(self.source, self.KEYS)
+        await redis_backup.save(self.delta_path, incremental=True, redis=self.source)
+
+    async def test_full_and_delta_restore_equal_source(self):
+        await self._save_chain()
+        target = FakeRedis()
+        target.data["list:1"] = ("list", ["stale"])  # present before restore, deleted by the delta
+        await redis_backup.restore([self.full_path, self.delta_path], redis=target)
+
+        expected, restored = _normalize(self.source.contents()), _normalize(target.contents())
+        self.assertEqual(expected.keys(), restored.keys())
+        for key, entry in expected.items():
+            self.assertEqual(entry, restored[key], key)
+        for key, ttl in self.source.ttls.items():
+            self.assertEqual(ttl, target.ttls.get(key), key)
+
+    async def test_passed_connections_stay_open(self):
+        await self._save_chain()
+        target = FakeRedis()
+        await redis_backup.restore([self.full_path, self.delta_path], redis=target)
+        self.assertFalse(self.source.closed)
+        self.assertFalse(target.closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
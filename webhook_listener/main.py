@@ -1,3 +1,4 @@
+import hmac
 import json
 import os
 import sys
@@ -6,12 +7,42 @@ from hashlib import sha256
 
 import aioredis
 from aiohttp import web, ClientSession
+from arcadia_common.metrics import counter, histogram, start_metrics_server
 from loguru import logger
 
 from loc_issue_manager import publish_localization_changes, get_api_headers
 
 routes = web.RouteTableDef()
 
+# issue and PR records of `issues`, `issue_comment` and `pull_request` events, keeping bot's object cache fresh
+OBJECTS_CHANNEL = "github:objects"
+# `label`, `milestone` and team `membership` events, making bot refetch its metadata index
+METADATA_CHANNEL = "github:metadata"
+# secret configured for `/events` webhook, deliveries not signed with it are rejected
+WEBHOOK_SECRET = os.getenv("GITHUB_WEBHOOK_SECRET", "").encode("utf-8")
+
+_requests_total = counter("webhook_requests_total", "Handled webhook requests by route and status", ["route", "status"])
+_request_seconds = histogram("webhook_request_seconds", "Webhook request handling latency", ["route"])
+_github_request_seconds = histogram(
+    "github_request_seconds", "GitHub API request latency by endpoint", ["method", "endpoint"]
+)
+
+
+@web.middleware
+async def metrics_middleware(request: web.Request, handler):
+    route = request.match_info.route.resource.canonical if request.match_info.route.resource else "unmatched"
+    status = 500
+    try:
+        with _request_seconds.time(route=route):
+            response = await handler(request)
+        status = response.status
+        return response
+    except web.HTTPException as error:
+        status = error.status
+        raise
+    finally:
+        _requests_total.inc(route=route, status=status)
+
 
 async def publish(app: web.Application, redis, data: dict):
     try:
@@ -50,10 +81,11 @@ async def github_event_handler(request: web.Request):
         "after": data['after'],
     }
 
-    diff_res = await session.get(
-        f"{sent_data['repo']['url']}/compare/{data['before']}...{data['after']}",
-        headers=get_api_headers()
-    )
+    with _github_request_seconds.time(method="get", endpoint="/repos/{repo}/compare/{range}"):
+        diff_res = await session.get(
+            f"{sent_data['repo']['url']}/compare/{data['before']}...{data['after']}",
+            headers=get_api_headers()
+        )
     if diff_res.status < 400:
         logger.info(f"got the diff!")
         diff_data = await diff_res.json()
@@ -75,6 +107,56 @@ async def github_event_handler(request: web.Request):
     return web.Response(status=200)
 
 
+async def publish_metadata_event(redis, event: str, data: dict) -> web.Response:
+    message = {"kind": event, "repo": data.get("repository", {}).get("name")}
+    try:
+        await redis.publish(METADATA_CHANNEL, json.dumps(message))
+    except (aioredis.RedisError, ConnectionError) as error:
+        logger.warning(f"failed to publish {event} event: {error!r}")
+        return web.Response(status=503)
+    return web.Response(status=200)
+
+
+def signature_valid(body: bytes, signature: str) -> bool:
+    if not WEBHOOK_SECRET or not signature.startswith("sha256="):
+        return False
+    expected = hmac.new(WEBHOOK_SECRET, body, sha256).hexdigest()
+    return hmac.compare_digest(expected, signature[len("sha256="):])
+
+
+@routes.post("/events")
+async def github_object_event_handler(request: web.Request):
+    event = request.headers.get("X-GitHub-Event", "")
+    body = await request.read()
+    if not signature_valid(body, request.headers.get("X-Hub-Signature-256", "")):
+        logger.warning(f"rejected {event} event with invalid signature")
+        return web.Response(status=401)
+    data = json.loads(body)
+    if event in ("label", "milestone", "membership"):
+        return await publish_metadata_event(request.app["redis"], event, data)
+    if event == "pull_request":
+        kind, obj = "pulls", data["pull_request"]
+    elif event in ("issues", "issue_comment"):
+        kind, obj = "issues", data["issue"]
+    else:
+        return web.Response(status=204)
+
+    # record of deleted or transferred issue is no longer valid under this repo and number
+    removed = event == "issues" and data.get("action") in ("deleted", "transferred")
+    message = {
+        "repo": data["repository"]["name"],
+        "number": obj["number"],
+        "kind": kind,
+        "record": None if removed else obj,
+    }
+    try:
+        await request.app["redis"].publish(OBJECTS_CHANNEL, json.dumps(message))
+    except (aioredis.RedisError, ConnectionError) as error:
+        logger.warning(f"failed to publish {event} event of {message['repo']}#{message['number']}: {error!r}")
+        return web.Response(status=503)
+    return web.Response(status=200)
+
+
 @routes.get("/test")
 async def test(request: web.Request):
     logger.info(f"test request running")
@@ -83,14 +165,24 @@ async def test(request: web.Request):
     return web.json_response({"test": result})
 
 
+async def start_metrics(app: web.Application):
+    app["metrics_runner"] = await start_metrics_server(
+        os.getenv("METRICS_HOST", "0.0.0.0"), int(os.getenv("METRICS_PORT", 9100))
+    )
+
+
 async def init():
     url = os.getenv("REDIS_URl")
     pwd = os.getenv("PWD")
 
-    app = web.Application()
+    if not WEBHOOK_SECRET:
+        logger.warning("GITHUB_WEBHOOK_SECRET is not set, every /events delivery will be rejected")
+
+    app = web.Application(middlewares=[metrics_middleware])
     app["redis"] = await aioredis.create_redis_pool(url, password=pwd, maxsize=2)
     app["session"] = ClientSession()
     app.add_routes(routes)
+    app.on_startup.append(start_metrics)
     return app
 
 